@@ -1,13 +1,20 @@
 import docker
+import os
 import sys
 import re
 import time
-from collections import defaultdict
+import csv
+import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import deque
 import requests
 from datetime import datetime
 from colorama import init, Fore, Style
-from rich.console import Console
+from rich.console import Console, Group
+from rich.live import Live
 from rich.table import Table
+from rich.text import Text
 
 # 需要安装的模块：pip install docker requests colorama rich
 
@@ -15,6 +22,24 @@ from rich.table import Table
 # 初始化 colorama
 init(autoreset=True)
 
+# 实时界面的刷新帧率，解析进度流不受终端输出拖慢
+RENDER_FPS = 4
+# 瞬时速度的滑动窗口(秒)
+SPEED_WINDOW = 3.0
+DOCKER_SOCKET = 'unix://var/run/docker.sock'
+# 公网IP信息的磁盘缓存及有效期(秒)
+IP_CACHE_FILE = os.path.join(os.path.expanduser('~'), '.cache', 'docker_pull_speed', 'ip_info.json')
+IP_CACHE_TTL = 3600
+DOCKER_HUB_REGISTRY = 'registry-1.docker.io'
+MANIFEST_ACCEPT = ', '.join([
+    'application/vnd.docker.distribution.manifest.list.v2+json',
+    'application/vnd.oci.image.index.v1+json',
+    'application/vnd.docker.distribution.manifest.v2+json',
+    'application/vnd.oci.image.manifest.v1+json',
+])
+REPORT_FIELDS = ['image', 'status', 'ttfb', 'download_time', 'extract_time', 'total_time',
+                 'downloaded_bytes', 'download_mb_per_s', 'error']
+
 def format_size(bytes):
     """
     格式化字节数为可读的单位
@@ -48,35 +73,167 @@ def parse_size(size_str):
     }
     return number * unit_multipliers.get(unit.upper(), 1)
 
-def get_public_ip_info():
-    """获取本机的公网IP地址、地理区域和运营商"""
+class PullProgress:
+    """
+    镜像拉取进度: 按层分别记录下载字节和解压字节，收到事件时增量更新总量，
+    瞬时速度取最近 SPEED_WINDOW 秒内下载量的变化
+    """
+    def __init__(self, window=SPEED_WINDOW):
+        self.layers = {}          # 层ID -> 每层的状态和字节数
+        self.downloaded = 0       # 所有层已下载字节数之和
+        self.extracted = 0        # 所有层已解压字节数之和
+        self.window = window
+        self.samples = deque()    # (时间, 已下载字节数)
+        # 阶段时间点: 首个下载字节、最后一层下载完成、首个解压事件、最后一层解压完成
+        self.first_byte_time = None
+        self.download_done_time = None
+        self.extract_start_time = None
+        self.extract_done_time = None
+
+    def update(self, line):
+        layer_id = line.get('id')
+        status = line.get('status', '')
+        # 没有层ID的是摘要信息，'Pulling from' 事件的 id 是镜像标签
+        if not layer_id or status.startswith('Pulling from'):
+            return
+        layer = self.layers.setdefault(layer_id, {
+            'status': '', 'downloaded': 0, 'download_total': 0, 'extracted': 0, 'extract_total': 0
+        })
+        layer['status'] = status
+        progress_detail = line.get('progressDetail') or {}
+        current = progress_detail.get('current', 0)
+        total = progress_detail.get('total', 0)
+
+        if status == 'Downloading':
+            if current > layer['downloaded']:   # 只累加递增的部分
+                if self.first_byte_time is None:
+                    self.first_byte_time = time.time()
+                self.downloaded += current - layer['downloaded']
+                layer['downloaded'] = current
+            layer['download_total'] = total or layer['download_total']
+        elif status == 'Download complete':
+            self.download_done_time = time.time()
+            if layer['download_total'] > layer['downloaded']:
+                self.downloaded += layer['download_total'] - layer['downloaded']
+                layer['downloaded'] = layer['download_total']
+        elif status == 'Pull complete':
+            self.extract_done_time = time.time()
+        elif status == 'Extracting':
+            if self.extract_start_time is None:
+                self.extract_start_time = time.time()
+            if current > layer['extracted']:
+                self.extracted += current - layer['extracted']
+                layer['extracted'] = current
+            layer['extract_total'] = total or layer['extract_total']
+
+    def speed(self, now):
+        """滑动窗口内的下载速度(字节/秒)，每帧调用一次"""
+        self.samples.append((now, self.downloaded))
+        while len(self.samples) > 1 and now - self.samples[0][0] > self.window:
+            self.samples.popleft()
+        start_time, start_bytes = self.samples[0]
+        if now - start_time <= 0:
+            return 0
+        return (self.downloaded - start_bytes) / (now - start_time)
+
+    def render(self, now, start_time):
+        elapsed = now - start_time
+        average = self.downloaded / elapsed if elapsed > 0 else 0
+        summary = Text.assemble(
+            ("已下载: ", "magenta"), (format_size(self.downloaded), "yellow"),
+            (" | 已解压: ", "magenta"), (format_size(self.extracted), "yellow"),
+            (" | 速度: ", "cyan"), (f"{format_size(self.speed(now))}/s", "yellow"),
+            (" | 平均: ", "cyan"), (f"{format_size(average)}/s", "yellow"),
+        )
+        table = Table(show_header=True, header_style="bold cyan")
+        table.add_column("层ID", style="yellow")
+        table.add_column("状态")
+        table.add_column("下载", justify="right")
+        table.add_column("解压", justify="right")
+        for layer_id, layer in self.layers.items():
+            table.add_row(
+                layer_id, layer['status'],
+                f"{format_size(layer['downloaded'])}/{format_size(layer['download_total'])}",
+                f"{format_size(layer['extracted'])}/{format_size(layer['extract_total'])}"
+            )
+        return Group(summary, table)
+
+def fetch_public_ip():
+    """通过 3322.org 获取公网IP地址，失败返回 None"""
     try:
-        # 获取公网IP地址
         ip_response = requests.get('http://members.3322.org/dyndns/getip', timeout=5)
         if ip_response.status_code == 200:
             ip = ip_response.text.strip()
             # 验证IP格式
             if re.match(r'\d+\.\d+\.\d+\.\d+', ip):
-                # 获取地理位置信息，使用 ip-api.com
-                geo_response = requests.get(f'http://ip-api.com/json/{ip}?lang=zh-CN', timeout=5)
-                if geo_response.status_code == 200:
-                    geo_data = geo_response.json()
-                    if geo_data['status'] == 'success':
-                        region = f"{geo_data.get('regionName', '')} {geo_data.get('city', '')}"
-                        isp = geo_data.get('isp', '未知运营商')
-                        return ip, region.strip(), isp
-                    else:
-                        return ip, '无法获取区域信息', '无法获取运营商信息'
-                else:
-                    return ip, '无法获取区域信息', '无法获取运营商信息'
-            else:
-                return '未知', '无法解析公网IP', '无法获取运营商信息'
-        else:
-            return '未知', '无法获取公网IP', '无法获取运营商信息'
-    except Exception as e:
-        return '未知', f"无法获取公网IP及区域信息: {e}", '无法获取运营商信息'
+                return ip
+    except requests.exceptions.RequestException:
+        pass
+    return None
 
-def docker_pull_with_speed(image):
+def fetch_ip_geo():
+    """
+    通过 ip-api.com 查询本机出口IP的地理位置，不需要先知道IP，
+    因此可以与 fetch_public_ip 同时进行；失败返回 None
+    """
+    try:
+        geo_response = requests.get('http://ip-api.com/json/?lang=zh-CN', timeout=5)
+        if geo_response.status_code == 200:
+            geo_data = geo_response.json()
+            if geo_data.get('status') == 'success':
+                return geo_data
+    except (requests.exceptions.RequestException, ValueError):
+        pass
+    return None
+
+def get_public_ip_info():
+    """获取本机的公网IP地址、地理区域和运营商，IP 和地理位置两个查询并行执行"""
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        ip_future = executor.submit(fetch_public_ip)
+        geo_future = executor.submit(fetch_ip_geo)
+        ip, geo_data = ip_future.result(), geo_future.result()
+
+    if geo_data:
+        region = f"{geo_data.get('regionName', '')} {geo_data.get('city', '')}"
+        isp = geo_data.get('isp', '未知运营商')
+        return ip or geo_data.get('query', '未知'), region.strip(), isp
+    if ip:
+        return ip, '无法获取区域信息', '无法获取运营商信息'
+    return '未知', '无法获取公网IP', '无法获取运营商信息'
+
+def get_public_ip_info_cached(ttl=IP_CACHE_TTL, cache_file=IP_CACHE_FILE):
+    """
+    带磁盘缓存的 get_public_ip_info，缓存在 ttl 秒内有效，只缓存成功的查询结果
+    """
+    if ttl > 0:
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if time.time() - cached['timestamp'] < ttl:
+                return cached['ip'], cached['region'], cached['isp']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    ip, region, isp = get_public_ip_info()
+    if ttl > 0 and ip != '未知':
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            with open(cache_file, 'w', encoding='utf-8') as f:
+                json.dump({'timestamp': time.time(), 'ip': ip, 'region': region, 'isp': isp}, f, ensure_ascii=False)
+        except OSError:
+            pass
+    return ip, region, isp
+
+def ip_info_table(ip_address, region, isp):
+    # 使用 rich 来显示美化的表格
+    table = Table(show_header=True, header_style="bold cyan")
+    table.add_column("IP地址", style="yellow", justify="center")
+    table.add_column("IP区域", style="yellow", justify="center")
+    table.add_column("运营商", style="yellow", justify="center")
+    table.add_row(f"[bold yellow]{ip_address}[/]", f"[bold yellow]{region}[/]", f"[bold yellow]{isp}[/]")
+    return table
+
+def docker_pull_with_speed(image, ip_cache_ttl=IP_CACHE_TTL):
     try:
         client = docker.from_env()
     except docker.errors.DockerException as e:
@@ -100,79 +257,55 @@ def docker_pull_with_speed(image):
         print(f"{Fore.YELLOW}未指定标签，默认使用 'latest' 标签。")
 
     # 使用低级 API 以便获取详细的拉取信息
-    low_level_client = docker.APIClient(base_url='unix://var/run/docker.sock')
+    low_level_client = docker.APIClient(base_url=DOCKER_SOCKET)
 
     print(f"{Fore.CYAN}开始拉取镜像: {Fore.YELLOW}{image}")
 
-    # 获取并显示公网IP地址、区域和运营商
-    ip_address, region, isp = get_public_ip_info()
-
-    # 使用 rich 来显示美化的表格
+    # 公网IP地址、区域和运营商在后台查询，与拉取同时进行，查询耗时不计入拉取时间
     console = Console()
-    table = Table(show_header=True, header_style="bold cyan")
-    table.add_column("IP地址", style="yellow", justify="center")
-    table.add_column("IP区域", style="yellow", justify="center")
-    table.add_column("运营商", style="yellow", justify="center")
-
-    table.add_row(f"[bold yellow]{ip_address}[/]", f"[bold yellow]{region}[/]", f"[bold yellow]{isp}[/]")
-
-    console.print(table)
+    ip_executor = ThreadPoolExecutor(max_workers=1)
+    ip_future = ip_executor.submit(get_public_ip_info_cached, ip_cache_ttl)
+    ip_executor.shutdown(wait=False)
+    ip_table = None
 
     # 打印开始时间
     start_time = time.time()
     start_datetime = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     print(f"{Fore.GREEN}开始时间: {start_datetime}")
 
-    # 初始化变量
-    total_downloaded = 0
-    layer_downloaded = defaultdict(float)  # 存储每个层已下载的字节数
-    layer_totals = defaultdict(float)      # 存储每个层的总字节数
+    progress = PullProgress()
+    frame_interval = 1.0 / RENDER_FPS
+    last_render = 0
 
     try:
-        for line in low_level_client.pull(image, stream=True, decode=True):
-            if 'status' in line:
-                status = line['status']
-                id = line.get('id', '')
-                progress_detail = line.get('progressDetail', {})
-                current = progress_detail.get('current', 0)
-                total = progress_detail.get('total', 0)
-
-                if 'Downloading' in status or 'Extracting' in status:
-                    if id:
-                        if current > layer_downloaded[id]:  # 更新递增的下载量
-                            layer_downloaded[id] = current
-                            layer_totals[id] = total
-
-                    # 计算总已下载字节数
-                    total_downloaded = sum(layer_downloaded.values())
-
-                    # 计算下载速度
-                    current_time = time.time()
-                    elapsed_time = current_time - start_time
-                    if elapsed_time > 0:
-                        speed = total_downloaded / elapsed_time
-                    else:
-                        speed = 0
-
-                    # 显示进度和速度
-                    total_formatted = format_size(total_downloaded)
-                    speed_formatted = format_size(speed)
-
-                    # 构建输出字符串，并添加 '\033[K' 清除行尾
-                    output_str = (f"\r{Fore.MAGENTA}已下载: {Fore.YELLOW}{total_formatted} | "
-                                  f"{Fore.CYAN}速度: {Fore.YELLOW}{speed_formatted}/s\033[K")
-                    # 使用 sys.stdout.write 输出并刷新
-                    sys.stdout.write(output_str)
-                    sys.stdout.flush()
-
-        print(f"\n{Fore.GREEN}镜像拉取完成。")
-
-        # 计算并显示结束时间和总耗时
-        end_time = time.time()
-        end_datetime = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        # 解析每个事件只做增量更新，界面按固定帧率重绘
+        with Live(console=console, auto_refresh=False, transient=False) as live:
+            for line in low_level_client.pull(image, stream=True, decode=True):
+                if 'status' in line:
+                    progress.update(line)
+                now = time.time()
+                if now - last_render >= frame_interval:
+                    if ip_table is None and ip_future.done():
+                        ip_table = ip_info_table(*ip_future.result())
+                    view = progress.render(now, start_time)
+                    live.update(Group(ip_table, view) if ip_table else view, refresh=True)
+                    last_render = now
+            # 拉取到此结束，先记录结束时间，之后等待 IP 查询的时间不计入耗时和速度
+            end_time = time.time()
+            end_datetime = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            if ip_table is None:
+                ip_table = ip_info_table(*ip_future.result())
+            live.update(Group(ip_table, progress.render(end_time, start_time)), refresh=True)
+
+        print(f"{Fore.GREEN}镜像拉取完成。")
+
+        # 显示结束时间和总耗时
         total_time = end_time - start_time
         print(f"{Fore.GREEN}结束时间: {end_datetime}")
         print(f"{Fore.GREEN}总耗时: {Fore.YELLOW}{total_time:.2f} 秒")
+        if total_time > 0:
+            print(f"{Fore.GREEN}下载总量: {Fore.YELLOW}{format_size(progress.downloaded)} | "
+                  f"{Fore.GREEN}平均下载速度: {Fore.YELLOW}{format_size(progress.downloaded / total_time)}/s")
 
     except docker.errors.APIError as e:
         print(f"\n{Fore.RED}发生错误: {e.explanation}")
@@ -181,7 +314,328 @@ def docker_pull_with_speed(image):
     finally:
         client.close()
 
+def normalize_image(image):
+    """
+    未指定标签时补上 ':latest'，仓库地址中的端口号不视为标签
+    """
+    name = image.rsplit('/', 1)[-1]
+    if ':' not in name and '@' not in name:
+        image += ':latest'
+    return image
+
+def measure_pull(image, remove=False):
+    """
+    无界面地拉取一个镜像并记录各阶段耗时，供批量模式在多个线程中并行调用
+
+    Returns:
+        一行报告数据，字段见 REPORT_FIELDS，时间单位为秒
+    """
+    result = dict.fromkeys(REPORT_FIELDS, '')
+    result.update(image=image, status='ok')
+    client = docker.APIClient(base_url=DOCKER_SOCKET)
+    try:
+        try:
+            client.inspect_image(image)
+            if not remove:
+                result['status'] = 'exists'
+                result['error'] = '镜像已存在，未测量 (可使用 --remove 先删除)'
+                return result
+            client.remove_image(image)
+        except docker.errors.ImageNotFound:
+            pass
+
+        progress = PullProgress()
+        start_time = time.time()
+        for line in client.pull(image, stream=True, decode=True):
+            if 'error' in line:
+                raise docker.errors.APIError(line['error'])
+            if 'status' in line:
+                progress.update(line)
+        end_time = time.time()
+
+        result['total_time'] = round(end_time - start_time, 3)
+        result['downloaded_bytes'] = int(progress.downloaded)
+        if progress.first_byte_time:
+            result['ttfb'] = round(progress.first_byte_time - start_time, 3)
+            download_end = progress.download_done_time or end_time
+            download_time = download_end - progress.first_byte_time
+            result['download_time'] = round(download_time, 3)
+            if download_time > 0:
+                result['download_mb_per_s'] = round(progress.downloaded / download_time / 1024 ** 2, 2)
+        if progress.extract_start_time:
+            extract_end = progress.extract_done_time or end_time
+            result['extract_time'] = round(extract_end - progress.extract_start_time, 3)
+
+        if remove:
+            client.remove_image(image)
+    except docker.errors.DockerException as e:
+        result['status'] = 'error'
+        result['error'] = str(e)
+    finally:
+        client.close()
+    return result
+
+def write_report(results, path):
+    """按扩展名写出 CSV 或 JSON 报告"""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        if path.lower().endswith('.json'):
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        else:
+            writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+            writer.writeheader()
+            writer.writerows(results)
+
+def batch_pull(images, parallel=1, remove=False, output=None):
+    """
+    批量模式: 以 parallel 个并发拉取镜像列表，输出每个镜像的首字节时间、下载/解压耗时和平均速度
+    """
+    print(f"{Fore.CYAN}批量拉取 {Fore.YELLOW}{len(images)} {Fore.CYAN}个镜像，并发数: {Fore.YELLOW}{parallel}")
+    results = []
+    with ThreadPoolExecutor(max_workers=parallel) as executor:
+        futures = [executor.submit(measure_pull, image, remove) for image in images]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if result['status'] == 'ok':
+                print(f"{Fore.GREEN}✓ {Fore.YELLOW}{result['image']} {Fore.GREEN}"
+                      f"首字节 {result['ttfb'] or '-'}s | 下载 {result['download_time'] or '-'}s | "
+                      f"解压 {result['extract_time'] or '-'}s | 平均 {result['download_mb_per_s'] or '-'} MB/s")
+            else:
+                print(f"{Fore.RED}✗ {Fore.YELLOW}{result['image']} {Fore.RED}{result['error']}")
+
+    # 报告按输入顺序排列
+    order = {image: i for i, image in enumerate(images)}
+    results.sort(key=lambda r: order[r['image']])
+
+    table = Table(show_header=True, header_style="bold cyan")
+    for column in ("镜像", "状态", "首字节(s)", "下载(s)", "解压(s)", "总耗时(s)", "下载量", "MB/s"):
+        table.add_column(column, justify="right" if column != "镜像" else "left")
+    for r in results:
+        table.add_row(r['image'], r['status'], str(r['ttfb']), str(r['download_time']),
+                      str(r['extract_time']), str(r['total_time']),
+                      format_size(r['downloaded_bytes']) if r['downloaded_bytes'] != '' else '',
+                      str(r['download_mb_per_s']))
+    Console().print(table)
+
+    if output:
+        write_report(results, output)
+        print(f"{Fore.GREEN}报告已写入: {Fore.YELLOW}{output}")
+    return results
+
+def parse_image_reference(image):
+    """
+    拆分镜像名为 (仓库地址, 仓库路径, 标签或摘要)，Docker Hub 的官方镜像补上 library/
+    """
+    image = normalize_image(image)
+    registry = DOCKER_HUB_REGISTRY
+    first, _, rest = image.partition('/')
+    if rest and ('.' in first or ':' in first or first == 'localhost'):
+        registry, image = first, rest
+    if '@' in image:
+        repository, reference = image.split('@', 1)
+    else:
+        repository, reference = image.rsplit(':', 1)
+    if registry == DOCKER_HUB_REGISTRY and '/' not in repository:
+        repository = 'library/' + repository
+    return registry, repository, reference
+
+class RegistryProbe:
+    """
+    直接通过 Registry HTTP API (v2) 探测一个镜像源: 获取 manifest，
+    再对几个最大的层发起 Range 请求，测量延迟和吞吐，不需要完整拉取镜像
+    """
+    def __init__(self, base_url, repository, timeout=10):
+        if '://' not in base_url:
+            base_url = 'https://' + base_url
+        self.base_url = base_url.rstrip('/')
+        self.repository = repository
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def get(self, path, **kwargs):
+        url = f"{self.base_url}/v2/{self.repository}/{path}"
+        response = self.session.get(url, timeout=self.timeout, **kwargs)
+        # 匿名拉取也需要先按 WWW-Authenticate 获取 Bearer token
+        if response.status_code == 401 and 'Authorization' not in self.session.headers:
+            token = self.fetch_token(response.headers.get('WWW-Authenticate', ''))
+            if token:
+                response.close()
+                self.session.headers['Authorization'] = f'Bearer {token}'
+                response = self.session.get(url, timeout=self.timeout, **kwargs)
+        return response
+
+    def fetch_token(self, challenge):
+        if not challenge.lower().startswith('bearer '):
+            return None
+        params = dict(re.findall(r'(\w+)="([^"]*)"', challenge))
+        realm = params.pop('realm', None)
+        if not realm:
+            return None
+        params.setdefault('scope', f'repository:{self.repository}:pull')
+        response = self.session.get(realm, params=params, timeout=self.timeout)
+        if response.status_code != 200:
+            return None
+        data = response.json()
+        return data.get('token') or data.get('access_token')
+
+    def fetch_manifest(self, reference, platform='linux/amd64'):
+        """返回 (manifest, 耗时秒数)；多架构镜像按 platform 选出对应的 manifest"""
+        start = time.time()
+        response = self.get(f'manifests/{reference}', headers={'Accept': MANIFEST_ACCEPT})
+        response.raise_for_status()
+        manifest = response.json()
+        latency = time.time() - start
+        if 'manifests' in manifest:
+            os_name, _, arch = platform.partition('/')
+            for item in manifest['manifests']:
+                item_platform = item.get('platform', {})
+                if item_platform.get('os') == os_name and item_platform.get('architecture') == arch:
+                    response = self.get(f"manifests/{item['digest']}", headers={'Accept': MANIFEST_ACCEPT})
+                    response.raise_for_status()
+                    return response.json(), latency
+            raise ValueError(f"镜像没有 {platform} 平台的版本")
+        return manifest, latency
+
+    def sample_blob(self, digest, sample_bytes):
+        """对一个层发起 Range 请求，返回 (首字节耗时, 读取字节数, 总耗时)"""
+        start = time.time()
+        first_byte = None
+        received = 0
+        with self.get(f'blobs/{digest}', headers={'Range': f'bytes=0-{sample_bytes - 1}'},
+                      stream=True, allow_redirects=True) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(64 * 1024):
+                if first_byte is None:
+                    first_byte = time.time() - start
+                received += len(chunk)
+                # 不支持 Range 的源会返回整个层，读够样本大小即停止
+                if received >= sample_bytes:
+                    break
+        return first_byte or 0, received, time.time() - start
+
+def probe_mirror(mirror, image, sample_layers=3, sample_bytes=4 * 1024 ** 2, platform='linux/amd64'):
+    """
+    探测一个镜像源，返回 manifest 延迟、层下载首字节时间和吞吐
+    """
+    registry, repository, reference = parse_image_reference(image)
+    result = {'mirror': mirror, 'status': 'ok', 'manifest_latency': None,
+              'blob_ttfb': None, 'throughput': 0, 'sampled_bytes': 0, 'error': ''}
+    probe = RegistryProbe(mirror, repository)
+    try:
+        manifest, result['manifest_latency'] = probe.fetch_manifest(reference, platform)
+        layers = sorted(manifest.get('layers', []), key=lambda layer: layer.get('size', 0), reverse=True)
+        ttfbs = []
+        total_bytes = 0
+        total_time = 0
+        for layer in layers[:sample_layers]:
+            ttfb, received, elapsed = probe.sample_blob(layer['digest'], sample_bytes)
+            ttfbs.append(ttfb)
+            total_bytes += received
+            total_time += elapsed
+        if ttfbs:
+            result['blob_ttfb'] = sum(ttfbs) / len(ttfbs)
+        result['sampled_bytes'] = total_bytes
+        result['throughput'] = total_bytes / total_time if total_time > 0 else 0
+    except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+        result['status'] = 'error'
+        result['error'] = str(e)
+    finally:
+        probe.session.close()
+    return result
+
+def rank_mirrors(mirrors, image, sample_layers=3, sample_bytes=4 * 1024 ** 2, platform='linux/amd64'):
+    """
+    同时探测所有候选镜像源(包含镜像原本的仓库)，按吞吐从高到低、延迟从低到高排序
+    """
+    registry, _, _ = parse_image_reference(image)
+    # 镜像原本的仓库也参与比较，候选列表中已有同一主机时不重复探测
+    hosts = {mirror.split('://', 1)[-1].rstrip('/') for mirror in mirrors}
+    candidates = list(dict.fromkeys(([] if registry in hosts else [registry]) + list(mirrors)))
+    print(f"{Fore.CYAN}正在探测 {Fore.YELLOW}{len(candidates)} {Fore.CYAN}个镜像源: {Fore.YELLOW}{image}")
+    with ThreadPoolExecutor(max_workers=len(candidates)) as executor:
+        results = list(executor.map(
+            lambda mirror: probe_mirror(mirror, image, sample_layers, sample_bytes, platform), candidates))
+
+    results.sort(key=lambda r: (r['status'] != 'ok', -r['throughput'], r['manifest_latency'] or 0))
+
+    table = Table(show_header=True, header_style="bold cyan")
+    for column in ("排名", "镜像源", "Manifest延迟(s)", "层首字节(s)", "吞吐", "采样量"):
+        table.add_column(column)
+    table.add_column("备注", no_wrap=True, overflow="ellipsis", max_width=30)
+    for rank, r in enumerate(results, 1):
+        table.add_row(
+            str(rank), r['mirror'],
+            f"{r['manifest_latency']:.3f}" if r['manifest_latency'] is not None else '-',
+            f"{r['blob_ttfb']:.3f}" if r['blob_ttfb'] is not None else '-',
+            f"{format_size(r['throughput'])}/s" if r['status'] == 'ok' else '-',
+            format_size(r['sampled_bytes']),
+            r['error']
+        )
+    Console().print(table)
+    return results
+
+def mirror_image(mirror, image):
+    """把镜像名改写为从指定镜像源拉取的形式，例如 nginx:latest -> mirror.example.com/library/nginx:latest"""
+    registry, repository, reference = parse_image_reference(image)
+    host = mirror.split('://', 1)[-1].rstrip('/')
+    if host == registry:
+        return image
+    separator = '@' if reference.startswith('sha256:') else ':'
+    return f"{host}/{repository}{separator}{reference}"
+
+def fastest_image(mirrors, image, **probe_options):
+    """探测后返回从最快镜像源拉取时使用的镜像名，全部失败时返回原镜像名"""
+    results = rank_mirrors(mirrors, image, **probe_options)
+    if results and results[0]['status'] == 'ok':
+        best = mirror_image(results[0]['mirror'], image)
+        print(f"{Fore.GREEN}最快的镜像源: {Fore.YELLOW}{results[0]['mirror']}")
+        return best
+    print(f"{Fore.RED}所有镜像源探测失败，使用原镜像名拉取。")
+    return image
+
+def read_image_list(path):
+    """读取镜像列表文件，每行一个镜像，忽略空行和 # 注释"""
+    with open(path, encoding='utf-8') as f:
+        return [line.split('#', 1)[0].strip() for line in f if line.split('#', 1)[0].strip()]
+
 def main():
+    parser = argparse.ArgumentParser(description='Docker 镜像拉取速度监控')
+    parser.add_argument('images', nargs='*', help='要拉取的镜像，指定后以非交互的批量模式运行')
+    parser.add_argument('-f', '--file', help='镜像列表文件，每行一个镜像')
+    parser.add_argument('-p', '--parallel', type=int, default=1, help='批量模式的并发拉取数 (默认: 1)')
+    parser.add_argument('-o', '--output', help='批量模式的报告文件，.json 为 JSON 格式，其他为 CSV')
+    parser.add_argument('--remove', action='store_true', help='测量前删除已存在的镜像，测量后删除拉取的镜像，便于重复测试')
+    parser.add_argument('-m', '--mirrors', nargs='+', default=[],
+                        help='候选镜像源地址，拉取前通过 Registry API 探测并选用最快的一个')
+    parser.add_argument('--rank-only', action='store_true', help='只对镜像源测速排名，不拉取镜像')
+    parser.add_argument('--sample-layers', type=int, default=3, help='每个镜像源采样的层数 (默认: 3)')
+    parser.add_argument('--sample-mb', type=float, default=4, help='每层采样的大小(MB) (默认: 4)')
+    parser.add_argument('--platform', default='linux/amd64', help='多架构镜像选用的平台 (默认: linux/amd64)')
+    parser.add_argument('--ip-cache-ttl', type=int, default=IP_CACHE_TTL,
+                        help=f'公网IP信息的缓存有效期(秒), 0 为不使用缓存 (默认: {IP_CACHE_TTL})')
+    args = parser.parse_args()
+    probe_options = dict(sample_layers=args.sample_layers,
+                         sample_bytes=int(args.sample_mb * 1024 ** 2),
+                         platform=args.platform)
+
+    images = list(args.images)
+    if args.file:
+        images.extend(read_image_list(args.file))
+    if images:
+        # 去重并保持顺序，同一镜像并行拉取会互相干扰
+        images = list(dict.fromkeys(normalize_image(image) for image in images))
+        if args.rank_only:
+            for image in images:
+                rank_mirrors(args.mirrors, image, **probe_options)
+            return
+        if args.mirrors:
+            # 以第一个镜像探测出的最快镜像源拉取整批镜像
+            best = fastest_image(args.mirrors, images[0], **probe_options)
+            registry, _, _ = parse_image_reference(best)
+            images = [mirror_image(registry, image) for image in images]
+        batch_pull(images, max(1, args.parallel), args.remove, args.output)
+        return
+
     print(f"{Fore.BLUE}欢迎使用 Docker 镜像拉取速度监控脚本！")
     image_input = input(f"{Fore.BLUE}请输入要拉取的 Docker 镜像名称和标签（例如：ubuntu:latest）：{Style.RESET_ALL}").strip()
     if not image_input:
@@ -193,7 +647,13 @@ def main():
         image_input += ':latest'
         print(f"{Fore.YELLOW}未指定标签，默认使用 'latest' 标签。")
 
-    docker_pull_with_speed(image_input)
+    if args.mirrors or args.rank_only:
+        if args.rank_only:
+            rank_mirrors(args.mirrors, image_input, **probe_options)
+            return
+        image_input = fastest_image(args.mirrors, image_input, **probe_options)
+
+    docker_pull_with_speed(image_input, args.ip_cache_ttl)
 
 if __name__ == "__main__":
     main()
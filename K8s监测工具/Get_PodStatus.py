@@ -1,6 +1,13 @@
+import json
+import queue
 import smtplib
+import threading
+from collections import Counter, deque
+from datetime import datetime, timezone
 from email.mime.text import MIMEText
 from kubernetes import client, config
+from kubernetes.client.rest import ApiException
+from kubernetes.watch.watch import iter_resp_lines
 import time
 
 # 配置 K8s API 客户端
@@ -15,32 +22,460 @@ smtp_password = 'password'
 mail_from = 'user@example.com'
 mail_to = ['user1@example.com', 'user2@example.com']
 mail_subject = 'K8s Pod 监控告警'
+smtp_starttls = True
+# 同一告警(指纹相同)在冷却时间内只发送一次(秒)
+alert_cooldown = 1800
+# 告警攒批窗口(秒): 窗口内的告警合并成一封摘要邮件
+digest_interval = 30
 
-# 监控循环
-while True:
-    # 获取所有运行中的 Pod
-    pods = v1.list_pod_for_all_namespaces(watch=False)
-    # 统计运行中和失败的 Pod 数量
-    running_pods = 0
-    failed_pods = 0
-    for pod in pods.items:
-        if pod.status.phase == 'Running':
-            running_pods += 1
-        elif pod.status.phase == 'Failed':
-            failed_pods += 1
-    
-    # 发送邮件通知
-    if failed_pods > 0:
-        mail_body = f"当前共有 {running_pods+failed_pods} 个 Pod，其中 {failed_pods} 个 Pod 处于失败状态。"
+# watch 连接的超时时间(秒)，到期后用最后的 resourceVersion 重新建立
+watch_timeout = 300
+# watch 异常断开后的重试间隔(秒)
+retry_delay = 5
+# 全量 list 时每页的 Pod 数
+list_page_size = 500
+# 服务端过滤: 已成功结束的 Pod(如 Job)与告警无关，不传输也不进索引
+pod_field_selector = 'status.phase!=Succeeded'
+
+# 健康巡检间隔(秒)
+scan_interval = 30
+# 每个 Pod 保留最近多少次重启计数变化
+restart_history_size = 32
+# 重启频率阈值: {时间窗口(秒): 窗口内重启次数}，达到即告警
+restart_thresholds = {300: 3, 3600: 10}
+# Pending 超过该时长(秒)视为卡住
+pending_timeout = 600
+# 容器处于这些等待原因时告警(Pod 阶段仍可能是 Running)
+bad_waiting_reasons = {'CrashLoopBackOff', 'ImagePullBackOff', 'ErrImagePull', 'CreateContainerConfigError'}
+
+
+class PodRecord:
+    """
+    索引中每个 Pod 只保留告警需要的字段，用 __slots__ 避免每个实例带一个 __dict__
+    """
+    __slots__ = ('namespace', 'name', 'phase', 'restarts', 'waiting', 'created')
+
+    def __init__(self, namespace, name, phase, restarts, waiting=None, created=None):
+        self.namespace = namespace
+        self.name = name
+        self.phase = phase
+        self.restarts = restarts
+        self.waiting = waiting  # 第一个处于异常等待状态的容器原因，如 CrashLoopBackOff
+        self.created = created  # creationTimestamp 原始字符串，仅在巡检 Pending 时才解析
+
+    @classmethod
+    def from_raw(cls, pod):
+        """从 API 返回的原始 JSON 构造，不经过 V1Pod 模型的反序列化"""
+        metadata = pod['metadata']
+        status = pod.get('status') or {}
+        restarts = 0
+        waiting = None
+        for c in status.get('containerStatuses') or ():
+            restarts += c.get('restartCount', 0)
+            reason = ((c.get('state') or {}).get('waiting') or {}).get('reason')
+            if waiting is None and reason in bad_waiting_reasons:
+                waiting = reason
+        return cls(metadata['namespace'], metadata['name'], status.get('phase'), restarts,
+                   waiting, metadata.get('creationTimestamp'))
+
+
+class PodIndex:
+    """
+    内存中的 Pod 索引: 由一次全量 list 初始化，之后由 watch 事件增量更新。
+    按 (namespace, phase) 的计数随每次变更增量维护，统计时无需遍历全部 Pod。
+    变更过的命名空间记入 dirty，供巡检线程只检查有变化的部分
+    """
+    def __init__(self):
+        self.pods = {}            # (namespace, name) -> PodRecord
+        self.by_namespace = {}    # namespace -> {name: PodRecord}
+        self.counts = Counter()   # (namespace, phase) -> Pod 数
+        self.phase_counts = Counter()
+        self.restart_history = {}  # (namespace, name) -> deque[(时间, 重启次数)]
+        self.dirty = set()
+        self.lock = threading.Lock()
+
+    def _add(self, key, record):
+        self.pods[key] = record
+        self.by_namespace.setdefault(record.namespace, {})[record.name] = record
+        self.counts[record.namespace, record.phase] += 1
+        self.phase_counts[record.phase] += 1
+        self.dirty.add(record.namespace)
+        # 只在重启次数变化时记录一次，热路径上通常只是一次字典查找
+        history = self.restart_history.get(key)
+        if history is None:
+            history = self.restart_history[key] = deque(maxlen=restart_history_size)
+        if not history or history[-1][1] != record.restarts:
+            history.append((time.time(), record.restarts))
+
+    def _remove(self, key):
+        record = self.pods.pop(key, None)
+        if record is not None:
+            names = self.by_namespace[record.namespace]
+            del names[record.name]
+            if not names:
+                del self.by_namespace[record.namespace]
+            self.counts[record.namespace, record.phase] -= 1
+            self.phase_counts[record.phase] -= 1
+            self.dirty.add(record.namespace)
+        return record
+
+    def replace(self, records):
+        """
+        用全量 list 的结果重建索引，返回此前不在失败状态、现在失败的 Pod
+        """
+        with self.lock:
+            old_pods = self.pods
+            old_history = self.restart_history
+            self.pods = {}
+            self.by_namespace = {}
+            self.counts = Counter()
+            self.phase_counts = Counter()
+            self.restart_history = {}
+            newly_failed = []
+            for record in records:
+                key = (record.namespace, record.name)
+                # 仍然存在的 Pod 保留重启历史
+                if key in old_history:
+                    self.restart_history[key] = old_history[key]
+                self._add(key, record)
+                old = old_pods.get(key)
+                if record.phase == 'Failed' and (old is None or old.phase != 'Failed'):
+                    newly_failed.append(key)
+            self.dirty.update(self.by_namespace)
+        return newly_failed
+
+    def apply(self, event_type, record):
+        """
+        应用一个 watch 事件，返回 Pod 是否刚进入失败状态
+        """
+        key = (record.namespace, record.name)
+        with self.lock:
+            old = self._remove(key)
+            if event_type == 'DELETED':
+                self.restart_history.pop(key, None)
+                return False
+            self._add(key, record)
+        return record.phase == 'Failed' and (old is None or old.phase != 'Failed')
+
+    def snapshot(self, namespace):
+        """
+        返回命名空间内 [(PodRecord, 重启历史)] 的副本。PodRecord 只会被整体替换、不会原地修改，
+        因此拷贝后可以在锁外检查
+        """
+        with self.lock:
+            return [(record, tuple(self.restart_history[namespace, name]))
+                    for name, record in self.by_namespace.get(namespace, {}).items()]
+
+    def take_dirty(self):
+        with self.lock:
+            dirty, self.dirty = self.dirty, set()
+        return dirty
+
+    def count(self, phase, namespace=None):
+        if namespace is None:
+            return self.phase_counts[phase]
+        return self.counts[namespace, phase]
+
+
+class AlertPipeline:
+    """
+    告警管道: 监控循环只把告警放进队列，后台线程负责去重、攒批并通过一条常驻 SMTP 连接发送。
+    去重按指纹 (namespace, name, 原因) 进行，同一指纹在 alert_cooldown 内只发送一次
+    """
+    def __init__(self, cooldown=alert_cooldown, interval=digest_interval):
+        self.cooldown = cooldown
+        self.interval = interval
+        self.queue = queue.Queue()
+        self.last_sent = {}  # 指纹 -> 上次发送时间
+        self.smtp = None
+        self.thread = threading.Thread(target=self.run, name='alert-pipeline', daemon=True)
+        self.thread.start()
+
+    def submit(self, alerts, summary):
+        """
+        alerts 为 [(指纹, 告警内容)]，summary 为提交时的集群概况；只入队，不阻塞调用方
+        """
+        self.queue.put((alerts, summary))
+
+    def close(self):
+        """发送剩余告警后关闭 SMTP 连接"""
+        self.queue.put(None)
+        self.thread.join()
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            if item is None:
+                break
+            batch = [item]
+            # 收到第一条告警后再等待一个攒批窗口，窗口内到达的告警合并发送
+            deadline = time.monotonic() + self.interval
+            while True:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self.flush(batch)
+        self.disconnect()
+
+    def flush(self, batch):
+        now = time.monotonic()
+        pending = {}  # 指纹 -> 告警内容，同一批次内重复的告警只保留一条
+        for alerts, summary in batch:
+            for fingerprint, text in alerts:
+                last = self.last_sent.get(fingerprint)
+                if last is not None and now - last < self.cooldown:
+                    continue
+                pending[fingerprint] = text
+        if not pending:
+            return
+        summary = batch[-1][1]
+        mail_body = f"{summary}\n本次告警 {len(pending)} 条:\n" + '\n'.join(f"  {text}" for text in pending.values())
+        try:
+            self.send(mail_body)
+        except (smtplib.SMTPException, OSError) as e:
+            # 发送失败不进入冷却，重新入队，下一个攒批窗口后再发送
+            print(f"告警邮件发送失败: {e}，稍后重试")
+            self.queue.put((list(pending.items()), summary))
+            return
+        for fingerprint in pending:
+            self.last_sent[fingerprint] = now
+        # 过期的指纹不再需要，避免字典随 Pod 名称无限增长
+        self.last_sent = {fp: t for fp, t in self.last_sent.items() if now - t < self.cooldown}
+
+    def connect(self):
+        smtp = smtplib.SMTP(smtp_server, smtp_port)
+        if smtp_starttls:
+            smtp.starttls()
+        if smtp_user:
+            smtp.login(smtp_user, smtp_password)
+        self.smtp = smtp
+
+    def disconnect(self):
+        if self.smtp is not None:
+            try:
+                self.smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.smtp = None
+
+    def send(self, mail_body):
         msg = MIMEText(mail_body)
         msg['From'] = mail_from
         msg['To'] = ', '.join(mail_to)
         msg['Subject'] = mail_subject
-        smtp = smtplib.SMTP(smtp_server, smtp_port)
-        smtp.starttls()
-        smtp.login(smtp_user, smtp_password)
-        smtp.sendmail(mail_from, mail_to, msg.as_string())
-        smtp.quit()
-    
-    # 等待 5 分钟后再次检查
-    time.sleep(300)
+        # 常驻连接可能已被服务器因空闲断开，失败时重连一次再发送
+        for attempt in range(2):
+            try:
+                if self.smtp is None:
+                    self.connect()
+                self.smtp.sendmail(mail_from, mail_to, msg.as_string())
+                return
+            except (smtplib.SMTPException, OSError):
+                self.disconnect()
+                if attempt:
+                    raise
+
+
+def cluster_summary(index):
+    running_pods = index.count('Running')
+    failed_pods = index.count('Failed')
+    pending_pods = index.count('Pending')
+    return (f"当前共有 {len(index.pods)} 个 Pod，其中 {running_pods} 个运行中，"
+            f"{pending_pods} 个 Pending，{failed_pods} 个处于失败状态。")
+
+
+def alert_failed(index, failed_keys, pipeline):
+    if not failed_keys:
+        return
+    summary = cluster_summary(index)
+    pipeline.submit([((namespace, name, 'Failed'), f"{namespace}/{name} 进入失败状态")
+                     for namespace, name in failed_keys], summary)
+
+
+def parse_timestamp(value):
+    return datetime.strptime(value, '%Y-%m-%dT%H:%M:%SZ').replace(tzinfo=timezone.utc).timestamp()
+
+
+def restarts_within(history, window, now):
+    """
+    根据重启历史计算最近 window 秒内的重启次数: 最新计数减去窗口开始时的计数。
+    窗口开始前没有记录时，以最早一条记录为基准(此前的重启不可知)
+    """
+    baseline = history[0][1]
+    for timestamp, restarts in history:
+        if timestamp > now - window:
+            break
+        baseline = restarts
+    return history[-1][1] - baseline
+
+
+def check_namespace(index, namespace, now):
+    """
+    检查一个命名空间内的 Pod，返回 (告警列表, 是否需要下次继续巡检)。
+    Pending 卡住与容器异常等待会随时间持续，这类命名空间即使没有变更也要继续检查
+    """
+    alerts = []
+    recheck = False
+    for record, history in index.snapshot(namespace):
+        pod = f"{namespace}/{record.name}"
+        if record.waiting:
+            recheck = True
+            alerts.append(((namespace, record.name, record.waiting), f"{pod} 容器处于 {record.waiting}"))
+        if record.phase == 'Pending' and record.created:
+            recheck = True
+            pending = now - parse_timestamp(record.created)
+            if pending > pending_timeout:
+                alerts.append(((namespace, record.name, 'Pending'), f"{pod} 已 Pending {int(pending // 60)} 分钟"))
+        if len(history) > 1:
+            for window, threshold in restart_thresholds.items():
+                count = restarts_within(history, window, now)
+                if count >= threshold:
+                    alerts.append(((namespace, record.name, f'restarts/{window}'),
+                                   f"{pod} 最近 {window // 60} 分钟重启 {count} 次"))
+                    break
+    return alerts, recheck
+
+
+class HealthScanner:
+    """
+    后台巡检线程: 每 scan_interval 秒检查各命名空间的容器状态，结果交给告警管道。
+    检查只读取 watch 维护的内存索引，没有 I/O，在本线程中逐个检查即可。
+    只检查上次巡检后有变更的命名空间以及仍有 Pending/异常等待 Pod 的命名空间，
+    数千个命名空间的集群中每轮通常只需检查很少一部分
+    """
+    def __init__(self, index, pipeline, interval=scan_interval):
+        self.index = index
+        self.pipeline = pipeline
+        self.interval = interval
+        self.recheck = set()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='health-scanner', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.scan()
+            except Exception as e:
+                print(f"健康巡检失败: {e}")
+
+    def scan(self):
+        namespaces = self.index.take_dirty() | self.recheck
+        if not namespaces:
+            return
+        now = time.time()
+        alerts = []
+        recheck = set()
+        for namespace in namespaces:
+            found, pending = check_namespace(self.index, namespace, now)
+            alerts.extend(found)
+            if pending:
+                recheck.add(namespace)
+        self.recheck = recheck
+        if alerts:
+            self.pipeline.submit(alerts, cluster_summary(self.index))
+
+
+def list_pod_pages():
+    """
+    分页 list 全部 Pod，每页 list_page_size 个，直接解析原始 JSON。
+    生成 (原始 Pod 列表, resourceVersion)，各页属于同一个一致性快照
+    """
+    _continue = None
+    while True:
+        response = v1.list_pod_for_all_namespaces(limit=list_page_size, _continue=_continue,
+                                                  field_selector=pod_field_selector,
+                                                  _preload_content=False)
+        data = json.loads(response.data)
+        yield data['items'], data['metadata']['resourceVersion']
+        _continue = data['metadata'].get('continue')
+        if not _continue:
+            break
+
+
+def watch_pod_events(resource_version):
+    """
+    从 resourceVersion 开始 watch Pod 变更，逐行解析原始 JSON 事件，不构造 V1Pod 对象
+    """
+    response = v1.list_pod_for_all_namespaces(watch=True, resource_version=resource_version,
+                                              field_selector=pod_field_selector,
+                                              allow_watch_bookmarks=True,
+                                              timeout_seconds=watch_timeout,
+                                              _preload_content=False)
+    try:
+        for line in iter_resp_lines(response):
+            if line.strip():
+                yield json.loads(line)
+    finally:
+        response.release_conn()
+
+
+def relist(index, pipeline):
+    """
+    全量 list 一次重建索引，返回用于继续 watch 的 resourceVersion
+    """
+    resource_version = None
+    records = []
+    for items, resource_version in list_pod_pages():
+        records.extend(PodRecord.from_raw(pod) for pod in items)
+    alert_failed(index, index.replace(records), pipeline)
+    print(f"已同步 {len(index.pods)} 个 Pod，resourceVersion={resource_version}")
+    return resource_version
+
+
+def monitor():
+    """
+    监控循环: 只在启动和 watch 返回 410 Gone 时全量 list，
+    其余时间通过 watch 接收增量事件，Pod 失败后几秒内即可告警
+    """
+    index = PodIndex()
+    pipeline = AlertPipeline()
+    scanner = HealthScanner(index, pipeline)
+    resource_version = None
+    try:
+        while True:
+            try:
+                if resource_version is None:
+                    resource_version = relist(index, pipeline)
+                for event in watch_pod_events(resource_version):
+                    pod = event['object']
+                    # 410 Gone 等错误以 ERROR 事件的形式出现在 watch 流中
+                    if event['type'] == 'ERROR':
+                        raise ApiException(status=pod.get('code'), reason=pod.get('message'))
+                    # BOOKMARK 事件只携带最新的 resourceVersion，用于断线后从这里继续
+                    resource_version = pod['metadata']['resourceVersion']
+                    if event['type'] == 'BOOKMARK':
+                        continue
+                    record = PodRecord.from_raw(pod)
+                    if index.apply(event['type'], record):
+                        alert_failed(index, [(record.namespace, record.name)], pipeline)
+            except ApiException as e:
+                if e.status == 410:
+                    print("resourceVersion 已过期，重新全量同步")
+                    resource_version = None
+                else:
+                    print(f"K8s API 错误: {e.status} {e.reason}，{retry_delay} 秒后重试")
+                    time.sleep(retry_delay)
+            except Exception as e:
+                print(f"watch 连接中断: {e}，{retry_delay} 秒后重试")
+                time.sleep(retry_delay)
+
+    finally:
+        scanner.stop()
+        pipeline.close()
+
+if __name__ == '__main__':
+    monitor()
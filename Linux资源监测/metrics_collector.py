@@ -0,0 +1,244 @@
+import argparse
+import os
+import time
+from array import array
+
+# 常驻采集器: 按固定间隔采集 CPU(含每个核心)、内存、磁盘和负载，
+# 结果保存在定长的环形缓冲区中。只依赖标准库，适合在大量主机上以 1 秒间隔长期运行
+
+# 每个指标在内存中保留的采样点数
+DEFAULT_CAPACITY = 3600
+
+
+class RingBuffer:
+    """
+    定长环形缓冲区，数据存放在预分配的 array 中，写入时不创建新对象
+    """
+    def __init__(self, capacity, typecode='d'):
+        self.data = array(typecode, bytes(capacity * array(typecode).itemsize))
+        self.capacity = capacity
+        self.pos = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, value):
+        self.data[self.pos] = value
+        self.pos += 1
+        if self.pos == self.capacity:
+            self.pos = 0
+        if self.count < self.capacity:
+            self.count += 1
+
+    def last(self):
+        return self.data[self.pos - 1] if self.count else None
+
+    def values(self):
+        """按时间顺序(旧 -> 新)返回一个 array 副本"""
+        if self.count < self.capacity:
+            return self.data[:self.count]
+        return self.data[self.pos:] + self.data[:self.pos]
+
+
+class ProcFile:
+    """
+    保持 /proc 文件句柄常开，每次读取只 seek(0) 并 readinto 预分配的缓冲区
+    """
+    def __init__(self, path, size=4096):
+        self.file = open(path, 'rb', buffering=0)
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+
+    def read(self):
+        self.file.seek(0)
+        n = self.file.readinto(self.buffer)
+        return bytes(self.view[:n])
+
+    def close(self):
+        self.view.release()
+        self.file.close()
+
+
+def meminfo_value(data, key):
+    """从 /proc/meminfo 内容中取出 key 对应的 kB 数，只切片不拆分整个文件"""
+    start = data.find(key)
+    if start < 0:
+        return None
+    start += len(key)
+    return int(data[start:data.index(b'kB', start)])
+
+
+def usage_percent(use, total):
+    return use * 100.0 / total if total else 0.0
+
+
+class MetricsCollector:
+    """
+    采集器: sample() 采集一次并写入各指标的环形缓冲区。
+    指标名: cpu(总体)、cpu0..cpuN(每个核心)、mem、swap、disk:<挂载点>、load1/load5/load15
+    """
+    def __init__(self, capacity=DEFAULT_CAPACITY, mounts=('/',)):
+        self.mounts = list(mounts)
+        with open('/proc/stat', 'rb') as f:
+            stat = f.read()
+        # 只需要文件开头的 cpu 行，缓冲区按 cpu 行的长度分配，后面很长的 intr 等行不再读取
+        self.cpu_names = []
+        end = 0
+        for line in stat.split(b'\n'):
+            if not line.startswith(b'cpu'):
+                break
+            self.cpu_names.append(line.split(None, 1)[0].decode())
+            end += len(line) + 1
+        self.cpu_lines = len(self.cpu_names)
+        self.stat = ProcFile('/proc/stat', end + 64 * self.cpu_lines)
+        self.meminfo = ProcFile('/proc/meminfo', 8192)
+        self.loadavg = ProcFile('/proc/loadavg', 128)
+        # 上一次采样各 cpu 行的忙碌/总 jiffies，用于计算增量
+        self.prev_busy = array('Q', bytes(8 * self.cpu_lines))
+        self.prev_total = array('Q', bytes(8 * self.cpu_lines))
+        self.read_cpu()
+
+        names = self.cpu_names + ['mem', 'swap'] + [f'disk:{m}' for m in self.mounts] + ['load1', 'load5', 'load15']
+        self.timestamps = RingBuffer(capacity)
+        self.series = {name: RingBuffer(capacity) for name in names}
+        # 采样时按顺序写入，避免每次按名字查字典
+        self.cpu_series = [self.series[name] for name in self.cpu_names]
+        self.disk_series = [self.series[f'disk:{m}'] for m in self.mounts]
+        self.load_series = [self.series['load1'], self.series['load5'], self.series['load15']]
+
+    def read_cpu(self):
+        """
+        读取 /proc/stat 的 cpu 行，返回各行自上次读取以来的使用率(百分比)
+        """
+        lines = self.stat.read().split(b'\n', self.cpu_lines)
+        usage = []
+        for i in range(self.cpu_lines):
+            # user nice system idle iowait irq softirq steal
+            fields = lines[i].split()
+            idle = int(fields[4]) + int(fields[5])
+            busy = int(fields[1]) + int(fields[2]) + int(fields[3]) + int(fields[6]) + int(fields[7]) + int(fields[8])
+            total = busy + idle
+            d_total = total - self.prev_total[i]
+            usage.append(usage_percent(busy - self.prev_busy[i], d_total))
+            self.prev_busy[i] = busy
+            self.prev_total[i] = total
+        return usage
+
+    def read_memory(self):
+        """
+        返回 (物理内存使用率, 交换分区使用率)。有 MemAvailable 时以它计算可用内存
+        """
+        data = self.meminfo.read()
+        mem_total = meminfo_value(data, b'MemTotal:')
+        available = meminfo_value(data, b'MemAvailable:')
+        if available is None:
+            available = (meminfo_value(data, b'MemFree:') + meminfo_value(data, b'Buffers:')
+                         + meminfo_value(data, b'Cached:'))
+        swap_total = meminfo_value(data, b'SwapTotal:')
+        swap_free = meminfo_value(data, b'SwapFree:')
+        return usage_percent(mem_total - available, mem_total), usage_percent(swap_total - swap_free, swap_total)
+
+    def read_load(self):
+        fields = self.loadavg.read().split(b' ', 3)
+        return float(fields[0]), float(fields[1]), float(fields[2])
+
+    def sample(self):
+        self.timestamps.append(time.time())
+        for ring, value in zip(self.cpu_series, self.read_cpu()):
+            ring.append(value)
+        mem, swap = self.read_memory()
+        self.series['mem'].append(mem)
+        self.series['swap'].append(swap)
+        for ring, mount in zip(self.disk_series, self.mounts):
+            st = os.statvfs(mount)
+            ring.append(usage_percent(st.f_blocks - st.f_bfree, st.f_blocks))
+        for ring, value in zip(self.load_series, self.read_load()):
+            ring.append(value)
+
+    def latest(self):
+        """各指标最近一次的采样值"""
+        return {name: ring.last() for name, ring in self.series.items()}
+
+    def run(self, interval, count=0, on_sample=None):
+        """
+        按固定间隔采样 count 次(0 表示一直运行)。按绝对时间对齐，采样耗时不会累积成漂移
+        """
+        next_tick = time.monotonic()
+        done = 0
+        while not count or done < count:
+            next_tick += interval
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # 落后超过一个周期时直接从当前时间重新对齐
+                next_tick = time.monotonic()
+            self.sample()
+            done += 1
+            if on_sample:
+                on_sample(self)
+
+    def close(self):
+        self.stat.close()
+        self.meminfo.close()
+        self.loadavg.close()
+
+
+def print_sample(collector, per_core=False):
+    latest = collector.latest()
+    parts = [f"CPU {latest['cpu']:5.1f}%", f"内存 {latest['mem']:5.1f}%", f"交换 {latest['swap']:5.1f}%"]
+    parts += [f"磁盘 {m} {latest[f'disk:{m}']:5.1f}%" for m in collector.mounts]
+    parts.append(f"负载 {latest['load1']:.2f} {latest['load5']:.2f} {latest['load15']:.2f}")
+    line = time.strftime('%H:%M:%S') + ' ' + ' | '.join(parts)
+    if per_core:
+        line += '\n    ' + ' '.join(f"{name}:{latest[name]:.0f}%" for name in collector.cpu_names[1:])
+    print(line)
+
+
+def print_summary(collector):
+    print(f"\n共采样 {len(collector.timestamps)} 次(缓冲区保留最近 {collector.timestamps.capacity} 次)")
+    print(f"{'指标':<12}{'平均':>10}{'最大':>10}")
+    for name, ring in collector.series.items():
+        values = ring.values()
+        if values:
+            print(f"{name:<12}{sum(values) / len(values):>10.2f}{max(values):>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='常驻采集 CPU(含每个核心)、内存、磁盘和负载')
+    parser.add_argument('-i', '--interval', type=float, default=1.0, help='采样间隔秒数 (默认: 1)')
+    parser.add_argument('-n', '--count', type=int, default=0, help='采样次数，0 表示一直运行 (默认: 0)')
+    parser.add_argument('--capacity', type=int, default=DEFAULT_CAPACITY,
+                        help=f'每个指标在内存中保留的采样点数 (默认: {DEFAULT_CAPACITY})')
+    parser.add_argument('-m', '--mount', action='append', help='需要检查的挂载点，可重复指定 (默认: /)')
+    parser.add_argument('--per-core', action='store_true', help='同时输出每个 CPU 核心的使用率')
+    parser.add_argument('-q', '--quiet', action='store_true', help='不逐次输出，只在结束时输出汇总')
+    parser.add_argument('--store', metavar='DIR', help='同时把采样写入时序存储目录，可用 metrics_store.py 查询')
+    args = parser.parse_args()
+
+    collector = MetricsCollector(args.capacity, args.mount or ['/'])
+    store = None
+    if args.store:
+        from metrics_store import MetricsStore
+        store = MetricsStore(args.store)
+
+    def on_sample(c):
+        if store:
+            store.append_sample(c.timestamps.last(), c.latest())
+        if not args.quiet:
+            print_sample(c, args.per_core)
+
+    try:
+        collector.run(args.interval, args.count, on_sample)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print_summary(collector)
+        collector.close()
+        if store:
+            store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+import argparse
+import gzip
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from metrics_collector import MetricsCollector
+
+# 内嵌的 Prometheus exporter: 采样线程每个周期采集一次并渲染好 /metrics 页面，
+# 抓取请求只返回缓存的字节，不会为每次抓取重新读取 /proc
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DEFAULT_PORT = 9101
+
+
+def escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render(collector):
+    """把采集器最近一次的采样渲染成 Prometheus 文本格式"""
+    latest = collector.latest()
+    lines = [
+        '# HELP host_cpu_usage_percent CPU usage since the previous sample.',
+        '# TYPE host_cpu_usage_percent gauge',
+    ]
+    for name in collector.cpu_names:
+        cpu = 'total' if name == 'cpu' else name[3:]
+        lines.append(f'host_cpu_usage_percent{{cpu="{cpu}"}} {latest[name]:.3f}')
+    lines += [
+        '# HELP host_memory_usage_percent Physical memory in use.',
+        '# TYPE host_memory_usage_percent gauge',
+        f"host_memory_usage_percent {latest['mem']:.3f}",
+        '# HELP host_swap_usage_percent Swap space in use.',
+        '# TYPE host_swap_usage_percent gauge',
+        f"host_swap_usage_percent {latest['swap']:.3f}",
+        '# HELP host_disk_usage_percent Disk space in use per mount point.',
+        '# TYPE host_disk_usage_percent gauge',
+    ]
+    for mount in collector.mounts:
+        lines.append(f'host_disk_usage_percent{{mountpoint="{escape_label(mount)}"}} {latest[f"disk:{mount}"]:.3f}')
+    for period in ('1', '5', '15'):
+        lines += [
+            f'# HELP host_load{period} {period} minute load average.',
+            f'# TYPE host_load{period} gauge',
+            f"host_load{period} {latest[f'load{period}']:.2f}",
+        ]
+    lines += [
+        '# HELP host_exporter_last_sample_timestamp_seconds Unix time of the last sample.',
+        '# TYPE host_exporter_last_sample_timestamp_seconds gauge',
+        f'host_exporter_last_sample_timestamp_seconds {collector.timestamps.last():.3f}',
+    ]
+    return ('\n'.join(lines) + '\n').encode()
+
+
+class Exporter:
+    """
+    采样线程与 HTTP 服务共享的状态。page 和 page_gzip 每个周期整体替换一次，
+    处理请求的线程只读取引用，不需要加锁
+    """
+    def __init__(self, collector, interval):
+        self.collector = collector
+        self.interval = interval
+        self.page = b''
+        self.page_gzip = gzip.compress(self.page)
+        self.ready = threading.Event()
+
+    def on_sample(self, collector):
+        page = render(collector)
+        self.page, self.page_gzip = page, gzip.compress(page, compresslevel=5)
+        self.ready.set()
+
+    def run(self):
+        try:
+            self.collector.run(self.interval, on_sample=self.on_sample)
+        except Exception as e:
+            print(f"采样线程异常退出: {e}")
+
+
+def make_handler(exporter):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] != '/metrics':
+                self.send_error(404)
+                return
+            # 采样线程在第一次采样前就退出时不能让抓取一直挂起
+            if not exporter.ready.wait(2 * exporter.interval):
+                self.send_error(503, 'No sample collected yet')
+                return
+            body = exporter.page
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            if 'gzip' in self.headers.get('Accept-Encoding', ''):
+                body = exporter.page_gzip
+                self.send_header('Content-Encoding', 'gzip')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # 抓取很频繁，不逐条打印访问日志
+            pass
+
+    return MetricsHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='以 Prometheus 格式输出 CPU、内存、磁盘和负载指标')
+    parser.add_argument('--listen', default='0.0.0.0', help='监听地址 (默认: 0.0.0.0)')
+    parser.add_argument('-p', '--port', type=int, default=DEFAULT_PORT, help=f'监听端口 (默认: {DEFAULT_PORT})')
+    parser.add_argument('-i', '--interval', type=float, default=5.0, help='采样间隔秒数 (默认: 5)')
+    parser.add_argument('-m', '--mount', action='append', help='需要检查的挂载点，可重复指定 (默认: /)')
+    args = parser.parse_args()
+
+    collector = MetricsCollector(capacity=2, mounts=args.mount or ['/'])
+    exporter = Exporter(collector, args.interval)
+    threading.Thread(target=exporter.run, name='sampler', daemon=True).start()
+    server = ThreadingHTTPServer((args.listen, args.port), make_handler(exporter))
+    server.daemon_threads = True
+    print(f"指标地址: http://{args.listen}:{args.port}/metrics，每 {args.interval} 秒采样一次")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        collector.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,293 @@
+import argparse
+import mmap
+import os
+import struct
+import time
+from array import array
+from urllib.parse import quote, unquote
+
+try:
+    import numpy as np
+except ImportError:  # 没有 numpy 时退回 array 实现，结果一致，只是大范围查询更慢
+    np = None
+
+# 紧凑的时序存储: 每个指标每个精度一个只追加的二进制文件，记录定长，查询时通过 mmap 读取。
+# 原始采样记录为 (时间戳, 值)，汇总记录为 (桶开始时间, 样本数, 总和, 最小值, 最大值)，均为小端 double
+
+RAW = struct.Struct('<2d')
+ROLLUP = struct.Struct('<5d')
+RAW_DTYPE = [('t', '<f8'), ('v', '<f8')]
+ROLLUP_DTYPE = [('t', '<f8'), ('count', '<f8'), ('sum', '<f8'), ('min', '<f8'), ('max', '<f8')]
+# 汇总精度: 名称 -> 桶宽(秒)
+ROLLUPS = {'1m': 60, '5m': 300, '1h': 3600}
+LEVELS = ['raw'] + list(ROLLUPS)
+# 各精度的默认保留时长(秒)
+DEFAULT_RETENTION = {'raw': 2 * 86400, '1m': 30 * 86400, '5m': 90 * 86400, '1h': 730 * 86400}
+# 检查保留期限的间隔(秒)；文件头部超期超过保留时长的 1/10 才重写，避免频繁整理
+RETENTION_CHECK = 600
+RETENTION_SLACK = 0.1
+
+
+def parse_duration(text):
+    """解析 '90'、'15m'、'24h'、'7d' 这样的时长，返回秒数"""
+    units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+    if text[-1] in units:
+        return float(text[:-1]) * units[text[-1]]
+    return float(text)
+
+
+class Series:
+    """
+    单个指标的存储: raw 文件和各汇总精度文件。追加原始样本时同步累加各精度的当前桶，
+    桶结束后写出一条汇总记录
+    """
+    def __init__(self, directory, metric, retention, readonly=False):
+        self.metric = metric
+        self.retention = retention
+        base = os.path.join(directory, quote(metric, safe=''))
+        self.paths = {level: f'{base}.{level}' for level in LEVELS}
+        self.fds = {}
+        if readonly:
+            return
+        self.fds = {level: os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                    for level, path in self.paths.items()}
+        # 各精度当前桶: [桶开始时间, 样本数, 总和, 最小值, 最大值]
+        self.buckets = {level: None for level in ROLLUPS}
+        self.recover()
+
+    def recover(self):
+        """重启后用 raw 文件补齐最后一条汇总记录之后的数据，保证汇总不因重启缺桶"""
+        for level, width in ROLLUPS.items():
+            last = self.last_record(level)
+            start = last[0] + width if last else 0.0
+            timestamps, values = self.read('raw', start)
+            for t, v in zip(timestamps, values):
+                self.add_to_bucket(level, width, t, v)
+
+    def file_size(self, level, record_size):
+        """文件中完整记录部分的字节数；写入中途被中断留下的半条记录忽略"""
+        try:
+            size = os.path.getsize(self.paths[level])
+        except FileNotFoundError:
+            return 0
+        return size - size % record_size
+
+    def last_record(self, level):
+        record = RAW if level == 'raw' else ROLLUP
+        size = self.file_size(level, record.size)
+        if not size:
+            return None
+        with open(self.paths[level], 'rb') as f:
+            f.seek(size - record.size)
+            return record.unpack(f.read(record.size))
+
+    def append(self, timestamp, value):
+        os.write(self.fds['raw'], RAW.pack(timestamp, value))
+        for level, width in ROLLUPS.items():
+            self.add_to_bucket(level, width, timestamp, value)
+
+    def add_to_bucket(self, level, width, timestamp, value):
+        bucket = self.buckets[level]
+        start = timestamp - timestamp % width
+        if bucket is not None and bucket[0] != start:
+            os.write(self.fds[level], ROLLUP.pack(*bucket))
+            bucket = None
+        if bucket is None:
+            self.buckets[level] = [start, 1, value, value, value]
+        else:
+            bucket[1] += 1
+            bucket[2] += value
+            if value < bucket[3]:
+                bucket[3] = value
+            if value > bucket[4]:
+                bucket[4] = value
+
+    def read(self, level, start=0.0, end=float('inf')):
+        """
+        读取 [start, end) 范围内的记录。时间戳有序，用二分查找定位范围后整段拷贝，不逐行构造对象。
+        raw 返回 (时间戳, 值)；汇总精度返回 (桶开始时间, 平均值, 最小值, 最大值)
+        """
+        dtype = RAW_DTYPE if level == 'raw' else ROLLUP_DTYPE
+        width = len(dtype)
+        size = self.file_size(level, 8 * width)
+        if not size:
+            return empty_columns(width)
+        with open(self.paths[level], 'rb') as f, mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as mm:
+            if np is not None:
+                records = np.frombuffer(mm, dtype=dtype)
+                i, j = np.searchsorted(records['t'], [start, end])
+                rows = records[i:j].copy()
+                del records
+                if level == 'raw':
+                    return rows['t'], rows['v']
+                return rows['t'], rows['sum'] / rows['count'], rows['min'], rows['max']
+            view = memoryview(mm).cast('d')
+            try:
+                n = len(view) // width
+                i = bisect_column(view, width, n, start)
+                j = bisect_column(view, width, n, end)
+                flat = array('d', view[i * width:j * width])
+            finally:
+                view.release()
+        columns = [flat[k::width] for k in range(width)]
+        if level == 'raw':
+            return columns[0], columns[1]
+        avg = array('d', [s / c for s, c in zip(columns[2], columns[1])])
+        return columns[0], avg, columns[3], columns[4]
+
+    def enforce_retention(self, now):
+        """
+        删除超出保留期限的记录: 只追加的文件无法截掉头部，把仍需保留的尾部写入新文件后原子替换
+        """
+        for level in LEVELS:
+            cutoff = now - self.retention[level]
+            record = RAW if level == 'raw' else ROLLUP
+            path = self.paths[level]
+            with open(path, 'rb') as f:
+                head = f.read(8)
+            if len(head) < 8 or struct.unpack('<d', head)[0] >= cutoff - self.retention[level] * RETENTION_SLACK:
+                continue
+            size = self.file_size(level, record.size)
+            with open(path, 'rb') as f, mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as mm:
+                view = memoryview(mm).cast('d')
+                try:
+                    width = record.size // 8
+                    keep = bisect_column(view, width, len(view) // width, cutoff) * record.size
+                finally:
+                    view.release()
+                tmp = path + '.tmp'
+                with open(tmp, 'wb') as out:
+                    out.write(mm[keep:])
+            os.close(self.fds[level])
+            os.replace(tmp, path)
+            self.fds[level] = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def close(self):
+        for fd in self.fds.values():
+            os.close(fd)
+
+
+def empty_columns(width):
+    if np is not None:
+        return tuple(np.empty(0) for _ in range(2 if width == 2 else 4))
+    return tuple(array('d') for _ in range(2 if width == 2 else 4))
+
+
+def bisect_column(view, width, n, value):
+    """在按时间排序的定长记录中二分查找第一个时间戳 >= value 的记录下标"""
+    lo, hi = 0, n
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if view[mid * width] < value:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def percentile(values, q):
+    if not len(values):
+        return None
+    if np is not None:
+        return float(np.percentile(values, q))
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+class MetricsStore:
+    """
+    按指标组织的存储目录。append_sample() 写入一次采样的全部指标，
+    summary() 查询一段时间内的平均值、最大最小值和分位数
+    """
+    def __init__(self, directory, retention=None, readonly=False):
+        self.directory = directory
+        self.retention = dict(DEFAULT_RETENTION, **(retention or {}))
+        self.readonly = readonly
+        if not readonly:
+            os.makedirs(directory, exist_ok=True)
+        self.series = {}
+        self.next_retention_check = 0.0
+
+    def get(self, metric):
+        series = self.series.get(metric)
+        if series is None:
+            series = self.series[metric] = Series(self.directory, metric, self.retention, self.readonly)
+        return series
+
+    def metrics(self):
+        suffix = '.raw'
+        return sorted(unquote(name[:-len(suffix)]) for name in os.listdir(self.directory) if name.endswith(suffix))
+
+    def append_sample(self, timestamp, values):
+        for metric, value in values.items():
+            if value is not None:
+                self.get(metric).append(timestamp, value)
+        if timestamp >= self.next_retention_check:
+            self.next_retention_check = timestamp + RETENTION_CHECK
+            for series in self.series.values():
+                series.enforce_retention(timestamp)
+
+    def choose_level(self, start, now):
+        """选择仍覆盖查询起点的最细精度"""
+        for level in LEVELS:
+            if now - self.retention[level] <= start:
+                return level
+        return LEVELS[-1]
+
+    def summary(self, metric, start, end=float('inf'), level=None, percentiles=(95,)):
+        """
+        查询统计值。raw 精度下分位数基于原始样本；汇总精度下基于每个桶的平均值
+        """
+        level = level or self.choose_level(start, time.time())
+        columns = self.get(metric).read(level, start, end)
+        values = columns[1]
+        minimums, maximums = (values, values) if level == 'raw' else (columns[2], columns[3])
+        count = len(values)
+        result = {'level': level, 'count': count}
+        if not count:
+            return result
+        if np is not None:
+            avg, minimum, maximum = values.mean(), minimums.min(), maximums.max()
+        else:
+            avg, minimum, maximum = sum(values) / count, min(minimums), max(maximums)
+        result.update(avg=float(avg), min=float(minimum), max=float(maximum))
+        for q in percentiles:
+            result[f'p{q:g}'] = percentile(values, q)
+        return result
+
+    def close(self):
+        for series in self.series.values():
+            series.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='查询 metrics_collector.py --store 写入的时序数据')
+    parser.add_argument('directory', help='存储目录')
+    parser.add_argument('metrics', nargs='*', help='指标名，如 cpu、mem、disk:/ (默认: 全部)')
+    parser.add_argument('-l', '--last', default='1h', help='查询最近多长时间，如 15m、24h、7d (默认: 1h)')
+    parser.add_argument('--level', choices=LEVELS, help='数据精度 (默认: 自动选择覆盖查询范围的最细精度)')
+    parser.add_argument('-p', '--percentile', type=float, action='append', help='需要计算的分位数，可重复指定 (默认: 95)')
+    args = parser.parse_args()
+
+    store = MetricsStore(args.directory, readonly=True)
+    percentiles = args.percentile or [95]
+    start = time.time() - parse_duration(args.last)
+    header = f"{'指标':<14}{'精度':<6}{'样本数':>8}{'平均':>10}{'最小':>10}{'最大':>10}"
+    print(header + ''.join(f"{f'p{q:g}':>10}" for q in percentiles))
+    try:
+        for metric in args.metrics or store.metrics():
+            result = store.summary(metric, start, level=args.level, percentiles=percentiles)
+            line = f"{metric:<14}{result['level']:<6}{result['count']:>8}"
+            if result['count']:
+                line += f"{result['avg']:>10.2f}{result['min']:>10.2f}{result['max']:>10.2f}"
+                line += ''.join(f"{result[f'p{q:g}']:>10.2f}" for q in percentiles)
+            print(line)
+    finally:
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+import argparse
+import heapq
+import os
+import time
+from array import array
+
+# 进程级 Top N 采样: 每个周期扫描 /proc/[pid]/stat，计算各进程的 CPU 与 RSS 增量，
+# 用大小为 N 的堆挑出占用最高的进程，不对全部进程排序
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+
+
+def format_size(num):
+    sign = '-' if num < 0 else ''
+    num = abs(num)
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if num < 1024:
+            return f"{sign}{num:.1f}{unit}"
+        num /= 1024
+    return f"{sign}{num:.1f}TB"
+
+
+def read_file(path, size=1024):
+    """一次 open/read/close 读取小文件，进程已退出时返回 None"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return None
+    try:
+        return os.read(fd, size)
+    except OSError:
+        return None
+    finally:
+        os.close(fd)
+
+
+def push_top(heap, size, item):
+    if len(heap) < size:
+        heapq.heappush(heap, item)
+    else:
+        heapq.heapreplace(heap, item)
+
+
+class ProcSampler:
+    """
+    上一周期的数据按 pid 升序保存在几个并行的 array 中(pid、CPU 时间、启动时间、RSS)，
+    本周期扫描时用双指针与之对齐，不为每个进程创建字典或对象
+    """
+    def __init__(self, top=10):
+        self.top = top
+        self.pids = array('i')
+        self.cpu = array('Q')
+        self.start = array('Q')
+        self.rss = array('q')
+        self.last_time = None
+        self.processes = 0
+
+    def scan(self):
+        """
+        扫描一次 /proc，返回 (按 CPU 排序的 Top N, 按 RSS 增长排序的 Top N)，
+        每项为 (CPU 百分比, RSS 字节数, RSS 变化字节数, pid, 进程名)
+        """
+        now = time.monotonic()
+        elapsed = now - self.last_time if self.last_time else 0.0
+        pids, cpu, start, rss = array('i'), array('Q'), array('Q'), array('q')
+        prev_pids, prev_cpu, prev_start, prev_rss = self.pids, self.cpu, self.start, self.rss
+        prev_count = len(prev_pids)
+        ticks = CLOCK_TICKS * elapsed
+        top_cpu, top_rss = [], []
+        j = 0
+        ordered = True
+        last_pid = -1
+        with os.scandir('/proc') as entries:
+            for entry in entries:
+                name = entry.name
+                if not name.isdigit():
+                    continue
+                data = read_file(f'/proc/{name}/stat')
+                if not data:
+                    continue
+                pid = int(name)
+                # 进程名可能包含空格和括号，字段从最后一个 ')' 之后开始
+                close = data.rfind(b')')
+                fields = data[close + 2:].split(b' ', 22)
+                # fields[11]/[12]: utime/stime，[19]: 启动时间，[21]: RSS 页数
+                total = int(fields[11]) + int(fields[12])
+                started = int(fields[19])
+                resident = int(fields[21]) * PAGE_SIZE
+                pids.append(pid)
+                cpu.append(total)
+                start.append(started)
+                rss.append(resident)
+                if pid < last_pid:
+                    ordered = False
+                last_pid = pid
+                if not ticks:
+                    continue
+                while j < prev_count and prev_pids[j] < pid:
+                    j += 1
+                # pid 被复用时启动时间不同，不能与上一周期的数据相减
+                if j >= prev_count or prev_pids[j] != pid or prev_start[j] != started:
+                    continue
+                cpu_percent = (total - prev_cpu[j]) * 100.0 / ticks
+                rss_delta = resident - prev_rss[j]
+                # 只有能进入 Top N 的进程才创建元组，堆顶是当前 Top N 中最小的一项
+                if len(top_cpu) < self.top or cpu_percent > top_cpu[0][0]:
+                    push_top(top_cpu, self.top, (cpu_percent, pid, data[data.find(b'(') + 1:close], resident, rss_delta))
+                if len(top_rss) < self.top or rss_delta > top_rss[0][0]:
+                    push_top(top_rss, self.top, (rss_delta, pid, data[data.find(b'(') + 1:close], resident, cpu_percent))
+        if not ordered:
+            # /proc 通常按 pid 升序列出；否则排序一次，保证下一周期可以双指针对齐
+            order = sorted(range(len(pids)), key=pids.__getitem__)
+            pids = array('i', (pids[i] for i in order))
+            cpu = array('Q', (cpu[i] for i in order))
+            start = array('Q', (start[i] for i in order))
+            rss = array('q', (rss[i] for i in order))
+        self.pids, self.cpu, self.start, self.rss = pids, cpu, start, rss
+        self.last_time = now
+        self.processes = len(pids)
+        by_cpu = [(c, r, d, p, n.decode(errors='replace')) for c, p, n, r, d in sorted(top_cpu, reverse=True)]
+        by_rss = [(c, r, d, p, n.decode(errors='replace')) for d, p, n, r, c in sorted(top_rss, reverse=True)]
+        return by_cpu, by_rss
+
+
+def print_top(title, rows):
+    print(title)
+    print(f"{'PID':>8} {'CPU%':>7} {'RSS':>10} {'RSS变化':>10}  名称")
+    for cpu_percent, resident, rss_delta, pid, name in rows:
+        # statm 的第二个字段是常驻页数，对输出的少数进程读取最新值
+        statm = read_file(f'/proc/{pid}/statm', 128)
+        if statm:
+            resident = int(statm.split(b' ', 2)[1]) * PAGE_SIZE
+        print(f"{pid:>8} {cpu_percent:>7.1f} {format_size(resident):>10} {format_size(rss_delta):>10}  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='按 CPU 和内存增长列出占用最高的进程')
+    parser.add_argument('-n', '--top', type=int, default=10, help='每个列表显示的进程数 (默认: 10)')
+    parser.add_argument('-i', '--interval', type=float, default=1.0, help='采样间隔秒数 (默认: 1)')
+    parser.add_argument('-c', '--count', type=int, default=0, help='输出次数，0 表示一直运行 (默认: 0)')
+    parser.add_argument('--sort', choices=['cpu', 'rss', 'both'], default='cpu', help='输出的排序方式 (默认: cpu)')
+    args = parser.parse_args()
+    if args.top < 1:
+        parser.error('--top 必须大于 0')
+
+    sampler = ProcSampler(args.top)
+    sampler.scan()
+    done = 0
+    try:
+        while not args.count or done < args.count:
+            time.sleep(args.interval)
+            scan_start = time.perf_counter()
+            by_cpu, by_rss = sampler.scan()
+            cost = (time.perf_counter() - scan_start) * 1000
+            print(f"\n{time.strftime('%H:%M:%S')} 共 {sampler.processes} 个进程，扫描耗时 {cost:.1f}ms")
+            if args.sort in ('cpu', 'both'):
+                print_top('按 CPU 使用率:', by_cpu)
+            if args.sort in ('rss', 'both'):
+                print_top('按 RSS 增长:', by_rss)
+            done += 1
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
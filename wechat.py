@@ -4,19 +4,199 @@ import requests
 import json
 import sys
 import os
+import time
+import queue
+import atexit
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import Future
+from requests.adapters import HTTPAdapter
 
 headers = {'Content-Type': 'application/json;charset=utf-8'}
 api_url = "https://qyapi.weixin.qq.com/cgi-bin/webhook/send?key=c4f1290a-xxx"
 
+# 企业微信机器人每分钟最多发送 20 条消息
+rate_limit = 20
+rate_period = 60.0
+# 本地计时与服务器存在偏差，窗口额外留出的余量(秒)
+rate_margin = 1.0
+# 发送失败时的最大重试次数及首次退避时间(秒)，之后每次翻倍
+max_retries = 3
+retry_backoff = 1.0
+# markdown 消息内容的字节上限，合并摘要不超过该长度
+max_markdown_bytes = 4000
+# 企业微信返回的频率超限错误码
+ERRCODE_RATE_LIMITED = 45009
+
+
+class RateLimited(Exception):
+    """企业微信返回频率超限(45009)"""
+
+
+class RateWindow:
+    """
+    滑动窗口限速: 任意 period 秒内最多发送 limit 次。记录最近 limit 次的发送时间，
+    窗口已满时等待最早的一次移出窗口。与按速率补充的令牌桶不同，突发之后不会在同一分钟内继续补发
+    """
+    def __init__(self, limit=None, period=None):
+        self.limit = limit or rate_limit
+        self.period = period or rate_period
+        self.sent = deque(maxlen=self.limit)
+        self.blocked_until = 0.0
+
+    def acquire(self):
+        now = time.monotonic()
+        wait = self.blocked_until - now
+        if len(self.sent) == self.limit:
+            wait = max(wait, self.sent[0] + self.period + rate_margin - now)
+        if wait > 0:
+            time.sleep(wait)
+        self.sent.append(time.monotonic())
+
+    def block(self):
+        """服务器判定超限时，等满一个完整窗口再发送"""
+        self.blocked_until = time.monotonic() + self.period + rate_margin
+
+
+class WeComGateway:
+    """
+    消息网关: send() 只把消息放进队列并立即返回 Future，后台线程按滑动窗口限速发送。
+    限速导致积压时，把排队的消息合并成一条 markdown 摘要，避免告警风暴中被企业微信丢弃
+    """
+    def __init__(self, url=None):
+        self.url = url or api_url
+        self.queue = queue.Queue()
+        self.window = RateWindow()
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.thread = threading.Thread(target=self.run, name='wecom-gateway', daemon=True)
+        self.thread.start()
+
+    def send(self, text):
+        """入队一条文本消息，返回在发送完成后得到企业微信响应的 Future"""
+        future = Future()
+        self.queue.put((text, future))
+        return future
+
+    async def send_async(self, text):
+        """asyncio 接口: 等待消息发送完成并返回企业微信的响应"""
+        return await asyncio.wrap_future(self.send(text))
+
+    def close(self):
+        """发送完队列中剩余的消息后停止后台线程"""
+        self.queue.put(None)
+        self.thread.join()
+        self.session.close()
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            batch = [item]
+            self.window.acquire()
+            # 等到发送额度后队列里仍有积压，就合并进同一条消息
+            stopping = False
+            while True:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self.deliver(batch)
+            if stopping:
+                break
+
+    def deliver(self, batch):
+        # 摘要超过长度上限时拆成多条，超出部分等待新的发送额度
+        while batch:
+            chunk, rest = split_digest(batch)
+            if len(chunk) == 1:
+                payload = {"msgtype": "text", "text": {"content": chunk[0][0]}}
+            else:
+                payload = {"msgtype": "markdown", "markdown": {"content": format_digest([t for t, _ in chunk])}}
+            try:
+                result = self.post(payload)
+            except RateLimited:
+                # 频率超限不算失败: 消息留在 batch 中，等满一个窗口后重发
+                print("企业微信发送频率超限，等待后重发")
+                self.window.block()
+                self.window.acquire()
+                continue
+            except Exception as e:
+                for _, future in chunk:
+                    future.set_exception(e)
+            else:
+                for _, future in chunk:
+                    future.set_result(result)
+            batch = rest
+            if batch:
+                self.window.acquire()
+
+    def post(self, payload):
+        """发送一次请求，网络错误和 5xx 时按指数退避重试；频率超限时抛出 RateLimited 由调用方等待窗口"""
+        delay = retry_backoff
+        for attempt in range(max_retries + 1):
+            try:
+                response = self.session.post(self.url, data=json.dumps(payload), timeout=10)
+                if response.status_code < 500:
+                    result = response.json()
+                    if result.get('errcode') == ERRCODE_RATE_LIMITED:
+                        raise RateLimited(result.get('errmsg'))
+                    return result
+                error = RuntimeError(f"企业微信返回: {response.status_code} {response.text[:200]}")
+            except (requests.RequestException, ValueError) as e:
+                error = e
+            if attempt < max_retries:
+                time.sleep(delay)
+                delay *= 2
+        raise error
+
+
+def format_digest(texts):
+    lines = [f"**合并发送 {len(texts)} 条消息**"]
+    lines += ["> " + text.replace('\n', '\n> ') for text in texts]
+    return '\n'.join(lines)
+
+
+def split_digest(batch):
+    """从 batch 开头取出不超过 max_markdown_bytes 的一组消息，返回 (本次发送, 剩余)"""
+    size = len(format_digest([]).encode())
+    for i, (text, _) in enumerate(batch):
+        size += len(text.encode()) + 3
+        if size > max_markdown_bytes and i > 0:
+            return batch[:i], batch[i:]
+    return batch, []
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    """进程内共享的网关，首次使用时创建，进程退出前发送完剩余消息"""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = WeComGateway()
+            atexit.register(_gateway.close)
+        return _gateway
+
+
 def msg(text):
-    json_text= {
-     "msgtype": "text",
-        "text": {
-            "content": text
-        },
-    }
-    print requests.post(api_url,json.dumps(json_text),headers=headers).content
+    """发送一条文本消息，不阻塞调用方；返回 Future，需要结果时调用 .result()"""
+    return get_gateway().send(text)
+
+
+async def msg_async(text):
+    return await get_gateway().send_async(text)
+
 
 if __name__ == '__main__':
     text = sys.argv[1]
-    msg(text)
+    print(msg(text).result())
@@ -1,38 +1,155 @@
 import requests
 import json
+import os
+import time
 import datetime
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from wechat import WeComGateway
 
-# 获取当前日期
-today = datetime.date.today().strftime("%Y-%m-%d")
+# 天气 API 与企业微信机器人配置
+api_url = "https://tianqiapi.com/free/day"
+appid = "你的API密钥"
+appsecret = "你的API密钥"
+webhook_url = "https://qyapi.weixin.qq.com/cgi-bin/webhook/send?key=你的Webhook Key"
 
-# 输入城市名称（拼音）
-city = input("请输入城市名称（拼音）:")
+# API 响应的磁盘缓存及有效期(秒)，重跑或重试时不重复消耗接口额度
+CACHE_FILE = os.path.join(os.path.expanduser('~'), '.cache', 'weather_push', 'responses.json')
+CACHE_TTL = 1800
+# 企业微信文本消息的字节上限，合并消息超过时按行拆成多条
+MAX_TEXT_BYTES = 2000
 
-# 从API获取天气信息
-response = requests.get(f"https://tianqiapi.com/free/day?appid=你的API密钥&appsecret=你的API密钥&city={city}&date={today}")
 
-# 转换JSON格式
-weather_info = json.loads(response.text)
+def load_cache(path=CACHE_FILE):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
 
-# 提取需要的信息
-date = weather_info["date"]
-week = weather_info["week"]
-wea = weather_info["wea"]
-tem = weather_info["tem"]
-win = weather_info["win"]
-air = weather_info["air"]
-humidity = weather_info["humidity"]
 
-# 构建消息体
-message = f"今天是{date} {week}，{city}天气为{wea}，温度为{tem}℃，风向是{win}，空气质量为{air}，湿度为{humidity}%。"
+def save_cache(cache, ttl, path=CACHE_FILE):
+    """只保留未过期的条目，先写临时文件再替换，避免中断时留下损坏的缓存"""
+    now = time.time()
+    cache = {key: entry for key, entry in cache.items() if now - entry['time'] < ttl}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, ensure_ascii=False)
+    os.replace(tmp, path)
 
-# 发送消息到企业微信机器人
-webhook_url = "https://qyapi.weixin.qq.com/cgi-bin/webhook/send?key=你的Webhook Key"
-data = {
-    "msgtype": "text",
-    "text": {
-        "content": message
-    }
-}
-response = requests.post(url=webhook_url, data=json.dumps(data))
-print(response.text)
+
+def create_session(workers):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def fetch_weather(session, city, date, cache, ttl):
+    """
+    获取一个城市的天气，命中未过期的缓存时不请求接口
+    """
+    key = f"{city}|{date}"
+    entry = cache.get(key)
+    if entry and time.time() - entry['time'] < ttl:
+        return entry['data']
+    response = session.get(api_url, params={'appid': appid, 'appsecret': appsecret, 'city': city, 'date': date},
+                           timeout=10)
+    response.raise_for_status()
+    weather_info = response.json()
+    if 'wea' not in weather_info:
+        raise ValueError(weather_info.get('errmsg') or weather_info)
+    cache[key] = {'time': time.time(), 'data': weather_info}
+    return weather_info
+
+
+def format_weather(city, weather_info):
+    return (f"{city}: {weather_info['wea']}，温度{weather_info['tem']}℃，风向{weather_info['win']}，"
+            f"空气质量{weather_info['air']}，湿度{weather_info['humidity']}%")
+
+
+def fetch_all(cities, date, workers, ttl):
+    """
+    并发获取所有城市的天气，共用一个连接池；返回与 cities 顺序一致的消息行
+    """
+    cache = load_cache() if ttl > 0 else {}
+    session = create_session(workers)
+
+    def fetch(city):
+        try:
+            return format_weather(city, fetch_weather(session, city, date, cache, ttl))
+        except (requests.RequestException, ValueError, KeyError) as e:
+            return f"{city}: 获取失败 ({e})"
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            lines = list(executor.map(fetch, cities))
+    finally:
+        session.close()
+    if ttl > 0:
+        save_cache(cache, ttl)
+    return lines
+
+
+def split_message(header, lines, limit=MAX_TEXT_BYTES):
+    """把合并消息按行拆成不超过 limit 字节的若干条"""
+    messages = []
+    current = header
+    for line in lines:
+        if len((current + '\n' + line).encode()) > limit and current != header:
+            messages.append(current)
+            current = header + '(续)'
+        current += '\n' + line
+    messages.append(current)
+    return messages
+
+
+def read_cities(args):
+    cities = list(args.cities)
+    if args.file:
+        with open(args.file, 'r', encoding='utf-8') as f:
+            cities += [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    if not cities:
+        # 未指定城市时保持原来的交互方式
+        cities = [input("请输入城市名称（拼音）:")]
+    # 去重并保持顺序
+    return list(dict.fromkeys(cities))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='获取一个或多个城市的天气，合并推送到企业微信机器人')
+    parser.add_argument('cities', nargs='*', help='城市名称（拼音），可指定多个')
+    parser.add_argument('-f', '--file', help='城市列表文件，每行一个城市')
+    parser.add_argument('-w', '--workers', type=int, default=8, help='并发请求数 (默认: 8)')
+    parser.add_argument('--ttl', type=int, default=CACHE_TTL,
+                        help=f'接口响应缓存的有效期(秒)，0 表示不使用缓存 (默认: {CACHE_TTL})')
+    parser.add_argument('--dry-run', action='store_true', help='只输出消息，不推送')
+    args = parser.parse_args()
+
+    # 获取当前日期
+    today = datetime.date.today()
+    date = today.strftime("%Y-%m-%d")
+    week = "星期" + "一二三四五六日"[today.weekday()]
+
+    cities = read_cities(args)
+    lines = fetch_all(cities, date, args.workers, args.ttl)
+    messages = split_message(f"今天是{date} {week}，各地天气:", lines)
+    for message in messages:
+        print(message)
+    if args.dry_run:
+        return
+
+    # 发送消息到企业微信机器人
+    gateway = WeComGateway(webhook_url)
+    try:
+        for future in [gateway.send(message) for message in messages]:
+            print(future.result())
+    finally:
+        gateway.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,14 @@ Async Web Load Tester (AWLT)
 
 特性:
 - 支持高并发异步请求
+- 两种调度模式: 持续并发(pool)与分批(batch)
+- 整个测试共用一个连接池，并统计连接复用情况
+- 开环恒定到达率模式(rate)，按计划发送时间计算延迟，避免协调遗漏
+- HDR 风格直方图记录延迟，内存占用固定，支持千万级请求的长时间测试
+- 多进程压测(--workers)，汇总各进程的直方图和错误统计
+- 按秒聚合的实时指标，可流式写入 JSONL/CSV 文件
+- 场景文件(JSONL)定义多种请求及权重，按接口分别统计延迟
+- 线性爬坡/阶梯/尖峰负载曲线，按阶段统计并自动找出吞吐拐点
 - 详细的性能指标统计
 - 实时进度显示
 - 完整的错误追踪
@@ -19,120 +27,976 @@ Async Web Load Tester (AWLT)
 import asyncio
 import aiohttp
 import time
+import os
+import csv
+import json
+import shutil
+import itertools
+import bisect
+import math
+import random
 import argparse
+import multiprocessing
+from queue import Empty
 from datetime import datetime
 from collections import defaultdict
-import statistics
+
+MODES = ('pool', 'batch', 'rate')
+ARRIVALS = ('constant', 'poisson')
+PROFILES = ('ramp', 'step', 'spike')
+# pool 模式下负载曲线控制器调整并发数的间隔(秒)；rate 模式按每个请求的计划发送时间计算速率
+PROFILE_TICK = 0.5
+
+class LatencyHistogram:
+    """
+    HDR 风格的对数分桶直方图，以微秒为单位记录延迟
+
+    每个 2 的幂区间再等分为 SUB_BUCKETS 个线性子桶，相对误差不超过 1/SUB_BUCKETS。
+    桶数组大小只取决于可记录的最大值，与请求数无关，插入为 O(1)
+    """
+    SUB_BUCKETS = 128
+
+    def __init__(self, max_seconds=3600):
+        self.max_value = int(max_seconds * 1_000_000)
+        self.counts = [0] * (self._index(self.max_value) + 1)
+        self.count = 0
+        self.total = 0
+        self.min_value = None
+        self.max_seen = 0
+
+    def _index(self, value):
+        # 小于 2*SUB_BUCKETS 的值一一对应，不损失精度
+        if value < 2 * self.SUB_BUCKETS:
+            return value
+        shift = value.bit_length() - self.SUB_BUCKETS.bit_length()
+        mantissa = value >> shift
+        return 2 * self.SUB_BUCKETS + (shift - 1) * self.SUB_BUCKETS + (mantissa - self.SUB_BUCKETS)
+
+    def _highest_equivalent(self, index):
+        if index < 2 * self.SUB_BUCKETS:
+            return index
+        offset = index - 2 * self.SUB_BUCKETS
+        shift = offset // self.SUB_BUCKETS + 1
+        mantissa = offset % self.SUB_BUCKETS + self.SUB_BUCKETS
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, seconds):
+        value = min(int(seconds * 1_000_000), self.max_value)
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min_value is None or value < self.min_value:
+            self.min_value = value
+        if value > self.max_seen:
+            self.max_seen = value
+
+    def merge(self, other):
+        for i, c in enumerate(other.counts):
+            if c:
+                self.counts[i] += c
+        self.count += other.count
+        self.total += other.total
+        if other.min_value is not None and (self.min_value is None or other.min_value < self.min_value):
+            self.min_value = other.min_value
+        self.max_seen = max(self.max_seen, other.max_seen)
+
+    def percentile(self, p):
+        """返回第 p 百分位的延迟(秒)，取所在桶的上界并以实际最大值封顶"""
+        if not self.count:
+            return 0.0
+        target = max(1, math.ceil(self.count * p / 100))
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                return min(self._highest_equivalent(i), self.max_seen) / 1_000_000
+        return self.max_seen / 1_000_000
+
+    @property
+    def min(self):
+        return (self.min_value or 0) / 1_000_000
+
+    @property
+    def max(self):
+        return self.max_seen / 1_000_000
+
+    @property
+    def mean(self):
+        return self.total / self.count / 1_000_000 if self.count else 0.0
+
+class RequestStats:
+    """一组请求(一个统计周期或一个接口)的完成数、错误数和成功请求的延迟直方图"""
+
+    def __init__(self):
+        self.histogram = LatencyHistogram()
+        self.completed = 0
+        self.errors = 0
+
+    def record(self, ok, response_time):
+        self.completed += 1
+        if ok:
+            self.histogram.record(response_time)
+        else:
+            self.errors += 1
+
+    def merge(self, other):
+        self.completed += other.completed
+        self.errors += other.errors
+        self.histogram.merge(other.histogram)
+
+class RequestTemplate:
+    """
+    场景中的一种请求。请求体在加载时一次性编码为 bytes，发送时直接复用
+    """
+
+    def __init__(self, url, method='GET', headers=None, body=None, weight=1, name=None, expect_status=200):
+        self.url = url
+        self.method = method.upper()
+        self.headers = dict(headers or {})
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body, ensure_ascii=False)
+            self.headers.setdefault('Content-Type', 'application/json')
+        self.body = body.encode('utf-8') if isinstance(body, str) else body
+        self.weight = float(weight)
+        if self.weight <= 0:
+            raise ValueError(f"请求权重必须大于 0: {url}")
+        self.name = name or f"{self.method} {url}"
+        self.expect_status = expect_status
+
+class Scenario:
+    """
+    按权重混合的一组请求模板
+
+    热路径上只做一次 random() 和一次二分查找，与模板数量基本无关
+    """
+
+    def __init__(self, templates):
+        if not templates:
+            raise ValueError("场景中没有任何请求")
+        self.templates = templates
+        self.cumulative = list(itertools.accumulate(t.weight for t in templates))
+        self.total_weight = self.cumulative[-1]
+
+    @classmethod
+    def single(cls, url, method='GET', headers=None, body=None):
+        return cls([RequestTemplate(url, method, headers, body, name=url)])
+
+    @classmethod
+    def load(cls, path):
+        """
+        从 JSONL 文件加载场景，每行一个请求模板:
+        {"name": "...", "method": "POST", "url": "...", "headers": {...}, "body": ..., "weight": 3}
+        """
+        templates = []
+        with open(path, encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                try:
+                    item = json.loads(line)
+                    templates.append(RequestTemplate(
+                        item['url'],
+                        method=item.get('method', 'GET'),
+                        headers=item.get('headers'),
+                        body=item.get('body'),
+                        weight=item.get('weight', 1),
+                        name=item.get('name'),
+                        expect_status=item.get('expect_status', 200)
+                    ))
+                except (ValueError, KeyError) as e:
+                    raise ValueError(f"场景文件第 {line_no} 行格式错误: {e}")
+        return cls(templates)
+
+    def pick(self):
+        if len(self.templates) == 1:
+            return self.templates[0]
+        return self.templates[bisect.bisect_right(self.cumulative, random.random() * self.total_weight)]
+
+class LoadProfile:
+    """
+    负载曲线，负载在 pool 模式下是并发数，在 rate 模式下是目标 RPS
+
+    - ramp:  从 start 线性增长到 end，平均分为 steps 个统计阶段
+    - step:  从 start 到 end 的 steps 级阶梯，每级保持 step_duration 秒
+    - spike: start 基线 -> end 尖峰 -> start 基线，各保持 step_duration 秒
+    """
+
+    def __init__(self, kind, start, end, steps=5, step_duration=10):
+        if kind not in PROFILES:
+            raise ValueError(f"未知的负载曲线: {kind}")
+        if start <= 0 or end <= 0:
+            raise ValueError("负载曲线的起止负载必须大于 0")
+        if steps < 1 or step_duration <= 0:
+            raise ValueError("阶段数和阶段时长必须大于 0")
+        self.kind = kind
+        self.start = start
+        self.end = end
+        self.steps = steps
+        self.step_duration = step_duration
+        # load_at 在 rate 模式下每个请求都会调用，预先算好各阶段
+        self._stages = self.stages()
+
+    def stages(self):
+        """返回 [(阶段起始负载, 阶段结束负载, 时长)]，阶段内负载线性插值"""
+        if self.kind == 'spike':
+            return [(self.start, self.start, self.step_duration),
+                    (self.end, self.end, self.step_duration),
+                    (self.start, self.start, self.step_duration)]
+        if self.steps == 1:
+            levels = [self.start, self.end]
+        else:
+            delta = (self.end - self.start) / (self.steps - 1 if self.kind == 'step' else self.steps)
+            levels = [self.start + delta * i for i in range(self.steps + 1)]
+        if self.kind == 'step':
+            return [(level, level, self.step_duration) for level in levels[:self.steps]]
+        return [(levels[i], levels[i + 1], self.step_duration) for i in range(self.steps)]
+
+    def load_at(self, elapsed):
+        """曲线开始 elapsed 秒时的负载"""
+        for start_load, end_load, duration in self._stages:
+            if elapsed < duration:
+                return start_load + (end_load - start_load) * elapsed / duration
+            elapsed -= duration
+        return self._stages[-1][1]
+
+    @property
+    def duration(self):
+        return sum(duration for _, _, duration in self.stages())
+
+    @property
+    def peak(self):
+        return max(self.start, self.end)
+
+    def describe(self):
+        return (f"{self.kind} {self.start:g} -> {self.end:g}, "
+                f"{len(self.stages())} 个阶段 x {self.step_duration:g} 秒")
+
+def find_knee(stages, growth_ratio=0.25, latency_jump=1.5):
+    """
+    在按阶段统计的结果中寻找拐点: 负载继续增加，但吞吐增幅不到负载增幅的 growth_ratio，
+    同时 P99 超过此前各阶段最低 P99 的 latency_jump 倍。
+    stages 为 [{'load', 'throughput', 'p99'}]，返回拐点所在阶段的下标，未出现拐点返回 None
+    """
+    best_p99 = None
+    for i in range(1, len(stages)):
+        prev, cur = stages[i - 1], stages[i]
+        if prev['p99'] > 0:
+            best_p99 = prev['p99'] if best_p99 is None else min(best_p99, prev['p99'])
+        if cur['load'] <= prev['load'] or prev['throughput'] <= 0 or best_p99 is None:
+            continue
+        load_gain = cur['load'] / prev['load'] - 1
+        throughput_gain = cur['throughput'] / prev['throughput'] - 1
+        if throughput_gain < growth_ratio * load_gain and cur['p99'] > latency_jump * best_p99:
+            return i
+    return None
+
+class TimeSeriesWriter:
+    """
+    把每个统计周期的指标逐行写入文件，扩展名为 .csv 时写 CSV，否则写 JSONL。
+    每行写完立即 flush，长时间测试中途也能查看，且不在内存中累积
+    """
+    FIELDS = ['timestamp', 'elapsed', 'completed', 'rps', 'error_rate', 'p50', 'p95', 'p99', 'in_flight']
+
+    def __init__(self, path):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.csv_writer = None
+        if path.lower().endswith('.csv'):
+            self.csv_writer = csv.DictWriter(self.file, fieldnames=self.FIELDS)
+            self.csv_writer.writeheader()
+
+    def write(self, row):
+        if self.csv_writer:
+            self.csv_writer.writerow(row)
+        else:
+            self.file.write(json.dumps(row, ensure_ascii=False) + '\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
 
 class LoadTester:
-    def __init__(self, url, total_requests, concurrent_requests, timeout=30):
+    def __init__(self, url, total_requests, concurrent_requests, timeout=30, mode='pool',
+                 pool_size=0, limit_per_host=0, keepalive_timeout=15, dns_ttl=10,
+                 rate=None, duration=None, arrival='constant', results_file=None,
+                 interval=1.0, output=None, scenario=None, profile=None, profile_scale=1.0):
+        if mode not in MODES:
+            raise ValueError(f"未知的调度模式: {mode}")
+        if mode == 'rate' and not profile and not (rate and duration):
+            raise ValueError("rate 模式需要指定目标速率和持续时间")
+        if profile and mode == 'batch':
+            raise ValueError("负载曲线不支持 batch 模式")
+        if arrival not in ARRIVALS:
+            raise ValueError(f"未知的到达分布: {arrival}")
         self.url = url
+        # 未指定场景时即为对 url 的单一 GET 请求
+        self.scenario = scenario or Scenario.single(url)
+        self.endpoint_stats = {t.name: RequestStats() for t in self.scenario.templates}
         self.total_requests = total_requests
         self.concurrent_requests = concurrent_requests
         self.timeout = timeout
-        self.results = []
+        self.mode = mode
+        # 连接池参数，0 表示不限制
+        self.pool_size = pool_size
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_ttl = dns_ttl
+        self.conn_stats = {'new': 0, 'reused': 0}
+        # 开环模式参数: 目标 RPS、持续时间(秒)和到达间隔分布
+        self.rate = rate
+        self.duration = duration
+        self.arrival = arrival
+        # 成功请求的延迟只进直方图；逐请求记录需显式指定文件，边测试边写入，不在内存中累积
+        self.histogram = LatencyHistogram()
+        self.results_file = results_file
+        self.results_out = None
+        self.sent = 0
+        self.completed = 0
         self.errors = defaultdict(int)
         self.start_time = None
         self.end_time = None
-        
-    async def make_request(self, session, request_id):
-        start_time = time.time()
+        # 子进程中为 (共享数组, 进程序号)，进度写入共享数组由父进程汇总显示
+        self.progress = None
+        # 按周期聚合的实时指标；子进程中 interval_queue 为父进程的结果队列
+        self.interval = interval
+        self.output = output
+        self.in_flight = 0
+        self.current_interval = RequestStats()
+        self.interval_queue = None
+        self.timeseries = None
+        # 负载曲线及按阶段的统计；多进程时 profile_scale 为本进程分担的负载比例
+        self.profile = profile
+        self.profile_scale = profile_scale
+        self.stage_stats = []
+        self.profile_done = False
+        self.target_concurrency = concurrent_requests
+        self.load_changed = None
+
+    def config(self):
+        return dict(url=self.url, total_requests=self.total_requests,
+                    concurrent_requests=self.concurrent_requests, timeout=self.timeout,
+                    mode=self.mode, pool_size=self.pool_size, limit_per_host=self.limit_per_host,
+                    keepalive_timeout=self.keepalive_timeout, dns_ttl=self.dns_ttl,
+                    rate=self.rate, duration=self.duration, arrival=self.arrival,
+                    results_file=self.results_file, interval=self.interval, output=self.output,
+                    scenario=self.scenario, profile=self.profile, profile_scale=self.profile_scale)
+
+    def worker_configs(self, workers):
+        """
+        把请求总数、并发数和目标速率平均分给各个子进程，余数分给前几个进程
+        """
+        def share(total, i):
+            return total // workers + (1 if i < total % workers else 0)
+
+        configs = []
+        for i in range(workers):
+            config = self.config()
+            config['total_requests'] = share(self.total_requests, i)
+            config['concurrent_requests'] = max(1, share(self.concurrent_requests, i))
+            # 连接池上限按进程均分，0 表示不限制保持不变
+            config['pool_size'] = share(self.pool_size, i) if self.pool_size else 0
+            if self.rate:
+                config['rate'] = self.rate / workers
+            # 时序文件由父进程统一写入；逐请求记录各进程先写各自的分片，结束后由父进程合并
+            config['output'] = None
+            if self.results_file:
+                config['results_file'] = f"{self.results_file}.{i}"
+            config['profile_scale'] = self.profile_scale / workers
+            configs.append(config)
+        return configs
+
+    def snapshot(self):
+        """子进程结束时回传给父进程的统计数据"""
+        return {
+            'sent': self.sent,
+            'completed': self.completed,
+            'histogram': self.histogram,
+            'errors': dict(self.errors),
+            'conn_stats': self.conn_stats,
+            'endpoint_stats': self.endpoint_stats,
+            'stage_stats': self.stage_stats
+        }
+
+    def merge(self, snapshot):
+        self.sent += snapshot['sent']
+        self.completed += snapshot['completed']
+        self.histogram.merge(snapshot['histogram'])
+        for error, count in snapshot['errors'].items():
+            self.errors[error] += count
+        for key, count in snapshot['conn_stats'].items():
+            self.conn_stats[key] += count
+        for name, stats in snapshot['endpoint_stats'].items():
+            self.endpoint_stats[name].merge(stats)
+        for i, stats in enumerate(snapshot['stage_stats']):
+            if i < len(self.stage_stats):
+                self.stage_stats[i].merge(stats)
+            else:
+                self.stage_stats.append(stats)
+
+    async def make_request(self, session, request_id, scheduled_time=None):
+        """
+        发送一个请求。开环模式下传入计划发送时间(perf_counter)，
+        延迟从计划时间算起，发送端积压造成的排队时间也计入延迟
+        """
+        template = self.scenario.pick()
+        start_time = scheduled_time if scheduled_time is not None else time.perf_counter()
+        self.in_flight += 1
         try:
-            async with session.get(self.url) as response:
-                response_time = time.time() - start_time
+            async with session.request(template.method, template.url,
+                                       headers=template.headers, data=template.body) as response:
+                # 读完响应体连接才会放回连接池复用，延迟也包含响应体的传输时间；
+                # 分块读取并丢弃，大响应不占内存
+                async for _ in response.content.iter_chunked(65536):
+                    pass
+                response_time = time.perf_counter() - start_time
                 status = response.status
-                if status != 200:
+                if status != template.expect_status:
                     self.errors[status] += 1
-                return {
-                    'request_id': request_id,
-                    'status': status,
-                    'response_time': response_time
-                }
+                self.record(request_id, template, status, response_time)
         except Exception as e:
             self.errors[str(e)] += 1
-            return {
+            self.record(request_id, template, 'error', time.perf_counter() - start_time, str(e))
+        finally:
+            self.in_flight -= 1
+
+    def record(self, request_id, template, status, response_time, error=None):
+        ok = status == template.expect_status
+        self.completed += 1
+        self.current_interval.record(ok, response_time)
+        self.endpoint_stats[template.name].record(ok, response_time)
+        # 曲线结束后排空在途请求的那部分不计入任何阶段
+        if self.stage_stats and not self.profile_done:
+            self.stage_stats[-1].record(ok, response_time)
+        if ok:
+            self.histogram.record(response_time)
+        if self.results_out:
+            result = {
                 'request_id': request_id,
-                'status': 'error',
-                'response_time': time.time() - start_time,
-                'error': str(e)
+                'endpoint': template.name,
+                'status': status,
+                'response_time': response_time
             }
+            if self.progress is not None:
+                # 多进程时各进程的请求编号独立计数，附上进程序号区分
+                result['worker'] = self.progress[1]
+            if error is not None:
+                result['error'] = error
+            self.results_out.write(json.dumps(result, ensure_ascii=False) + '\n')
 
-    async def run_batch(self, start_id):
-        connector = aiohttp.TCPConnector(limit=None, ssl=False)
+    def create_session(self):
+        """
+        创建整个测试共用的会话，TCP/TLS 握手和 DNS 解析只在建连时发生一次
+        """
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(self._on_connection_create)
+        trace_config.on_connection_reuseconn.append(self._on_connection_reuse)
+
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.dns_ttl,
+            ssl=False
+        )
         timeout = aiohttp.ClientTimeout(total=self.timeout)
-        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
-            tasks = []
-            for i in range(self.concurrent_requests):
-                request_id = start_id + i
-                if request_id < self.total_requests:
-                    tasks.append(self.make_request(session, request_id))
-            return await asyncio.gather(*tasks)
+        return aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                     trace_configs=[trace_config])
 
-    async def run_test(self):
-        print(f"\n开始测试 URL: {self.url}")
-        print(f"总请求数: {self.total_requests}")
-        print(f"并发数: {self.concurrent_requests}")
+    async def _on_connection_create(self, session, context, params):
+        self.conn_stats['new'] += 1
+
+    async def _on_connection_reuse(self, session, context, params):
+        self.conn_stats['reused'] += 1
+
+    async def run_batch(self, session, start_id):
+        tasks = []
+        for i in range(self.concurrent_requests):
+            request_id = start_id + i
+            if request_id < self.total_requests:
+                tasks.append(self.make_request(session, request_id))
+        await asyncio.gather(*tasks)
+
+    async def run_batches(self, session):
+        """
+        分批模式: 每批发出 concurrent_requests 个请求，等最慢的请求返回后再发下一批
+        """
+        for i in range(0, self.total_requests, self.concurrent_requests):
+            await self.run_batch(session, i)
+            self.update_progress()
+
+    async def run_pool(self, session):
+        """
+        持续并发模式: N 个常驻 worker 从共享计数器领取请求编号，
+        一个请求完成立即发出下一个，始终保持 N 个请求在途
+        """
+        request_ids = itertools.count()
+
+        async def worker(session):
+            # 单线程事件循环内 next() 不会被打断，无需加锁
+            for request_id in request_ids:
+                if request_id >= self.total_requests:
+                    return
+                await self.make_request(session, request_id)
+
+        reporter = asyncio.create_task(self.report_progress())
+        try:
+            workers = min(self.concurrent_requests, self.total_requests)
+            await asyncio.gather(*(worker(session) for _ in range(workers)))
+        finally:
+            reporter.cancel()
+        self.update_progress()
+
+    async def run_profile_pool(self, session):
+        """
+        按负载曲线调整并发数: 按峰值并发启动 worker，
+        编号不小于当前目标并发数的 worker 挂起等待，负载上升时再唤醒
+        """
+        request_ids = itertools.count()
+        self.load_changed = asyncio.Condition()
+        self.target_concurrency = 0
+
+        async def worker(k):
+            while not self.profile_done:
+                if k < self.target_concurrency:
+                    self.sent += 1
+                    await self.make_request(session, next(request_ids))
+                    continue
+                async with self.load_changed:
+                    await self.load_changed.wait_for(
+                        lambda: k < self.target_concurrency or self.profile_done)
+
+        reporter = asyncio.create_task(self.report_progress())
+        try:
+            peak = max(1, round(self.profile.peak * self.profile_scale))
+            workers = [asyncio.create_task(worker(k)) for k in range(peak)]
+            await self.drive_profile()
+            await asyncio.gather(*workers)
+        finally:
+            reporter.cancel()
+        self.update_progress()
+
+    async def drive_profile(self):
+        """
+        按负载曲线逐阶段调整负载水平，每个阶段的请求单独统计
+        """
+        for start_load, end_load, duration in self.profile.stages():
+            self.stage_stats.append(RequestStats())
+            stage_started = time.perf_counter()
+            while True:
+                elapsed = time.perf_counter() - stage_started
+                if elapsed >= duration:
+                    break
+                await self.set_load(start_load + (end_load - start_load) * elapsed / duration)
+                await asyncio.sleep(min(PROFILE_TICK, duration - elapsed))
+        self.profile_done = True
+        if self.load_changed:
+            async with self.load_changed:
+                self.load_changed.notify_all()
+
+    async def set_load(self, load):
+        if self.mode == 'rate':
+            # rate 模式的速率由 run_rate 按每个请求的计划发送时间计算
+            return
+        load *= self.profile_scale
+        concurrency = max(1, round(load))
+        if concurrency != self.target_concurrency:
+            async with self.load_changed:
+                self.target_concurrency = concurrency
+                self.load_changed.notify_all()
+
+    async def run_rate(self, session):
+        """
+        开环模式: 按固定时间表(恒定间隔或泊松到达)发出请求，
+        不论已有多少请求在途，持续 duration 秒保持目标 RPS。
+        使用负载曲线时按每个请求的计划发送时间从曲线上取目标 RPS，
+        drive_profile 只负责划分统计阶段
+        """
+        pending = set()
+
+        reporter = asyncio.create_task(self.report_progress())
+        driver = None
+        try:
+            start = time.perf_counter()
+            if self.profile:
+                self.rate = self.profile.load_at(0) * self.profile_scale
+                driver = asyncio.create_task(self.drive_profile())
+                deadline = start + self.profile.duration
+            else:
+                deadline = start + self.duration
+            next_time = start
+            while next_time < deadline:
+                # 补发所有已到计划时间的请求，之后再让出事件循环
+                now = time.perf_counter()
+                while next_time <= now and next_time < deadline:
+                    task = asyncio.create_task(self.make_request(session, self.sent, next_time))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+                    self.sent += 1
+                    if self.profile:
+                        self.rate = self.profile.load_at(next_time - start) * self.profile_scale
+                    next_time += self.next_interval()
+                await asyncio.sleep(max(0, next_time - time.perf_counter()))
+            if driver:
+                await driver
+            if pending:
+                await asyncio.gather(*pending)
+        finally:
+            if driver:
+                driver.cancel()
+            reporter.cancel()
+        self.update_progress()
+
+    def next_interval(self):
+        if self.arrival == 'poisson':
+            return random.expovariate(self.rate)
+        return 1 / self.rate
+
+    async def report_progress(self, interval=0.5):
+        while True:
+            await asyncio.sleep(interval)
+            self.update_progress()
+
+    async def report_intervals(self, started):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.emit_interval(started)
+
+    def emit_interval(self, started):
+        """
+        结束当前统计周期: 单进程时直接显示并写入时序文件，子进程中交给父进程汇总
+        """
+        stats, self.current_interval = self.current_interval, RequestStats()
+        now = time.perf_counter()
+        period = now - self.interval_started
+        self.interval_started = now
+        if self.interval_queue is not None:
+            _, index = self.progress
+            self.interval_queue.put(('interval', index, (stats, self.in_flight)))
+        else:
+            self.write_interval(self.interval_row(stats, now - started, period, self.in_flight))
+
+    def interval_row(self, stats, elapsed, period, in_flight):
+        completed = stats.completed
+        return {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'elapsed': round(elapsed, 3),
+            'completed': completed,
+            'rps': round(completed / period, 2) if period > 0 else 0.0,
+            'error_rate': round(stats.errors / completed, 4) if completed else 0.0,
+            'p50': stats.histogram.percentile(50),
+            'p95': stats.histogram.percentile(95),
+            'p99': stats.histogram.percentile(99),
+            'in_flight': in_flight
+        }
+
+    def write_interval(self, row):
+        print(f"\r[{row['elapsed']:7.1f}s] RPS: {row['rps']:.1f} | 错误率: {row['error_rate'] * 100:.2f}% | "
+              f"P50/P95/P99: {row['p50']:.3f}/{row['p95']:.3f}/{row['p99']:.3f} | "
+              f"在途: {row['in_flight']}\033[K")
+        if self.timeseries:
+            self.timeseries.write(row)
+
+    def update_progress(self):
+        if self.progress is None:
+            self.print_progress(self.sent, self.completed)
+            return
+        shared, index = self.progress
+        shared[2 * index] = self.sent
+        shared[2 * index + 1] = self.completed
+
+    def print_progress(self, sent, completed):
+        if self.mode == 'rate' or self.profile:
+            print(f"\r已发送: {sent} | 已完成: {completed} | 在途: {sent - completed}\033[K", end="")
+            return
+        progress = (completed / self.total_requests) * 100
+        print(f"\r进度: {progress:.1f}% ({completed}/{self.total_requests})", end="")
+
+    def print_header(self, workers=1):
+        if len(self.scenario.templates) > 1:
+            print(f"\n开始测试场景: {len(self.scenario.templates)} 种请求")
+            for t in self.scenario.templates:
+                print(f"  {t.name} (权重 {t.weight:g})")
+        else:
+            print(f"\n开始测试 URL: {self.scenario.templates[0].url}")
+        if self.profile:
+            unit = '目标速率(RPS)' if self.mode == 'rate' else '并发数'
+            print(f"负载曲线: {self.profile.describe()}，负载单位: {unit}")
+        elif self.mode == 'rate':
+            print(f"目标速率: {self.rate} RPS ({self.arrival})")
+            print(f"持续时间: {self.duration} 秒")
+        else:
+            print(f"总请求数: {self.total_requests}")
+            print(f"并发数: {self.concurrent_requests}")
+        print(f"调度模式: {self.mode}")
+        if workers > 1:
+            print(f"进程数: {workers}")
         print("测试进行中...\n")
 
+    async def execute(self):
+        if self.results_file:
+            self.results_out = open(self.results_file, 'w', encoding='utf-8')
         self.start_time = datetime.now()
-        
-        for i in range(0, self.total_requests, self.concurrent_requests):
-            batch_results = await self.run_batch(i)
-            self.results.extend(batch_results)
-            
-            # 显示进度
-            completed = min(i + self.concurrent_requests, self.total_requests)
-            progress = (completed / self.total_requests) * 100
-            print(f"\r进度: {progress:.1f}% ({completed}/{self.total_requests})", end="")
-            
+        started = self.interval_started = time.perf_counter()
+        ticker = asyncio.create_task(self.report_intervals(started))
+
+        try:
+            async with self.create_session() as session:
+                if self.mode == 'batch':
+                    await self.run_batches(session)
+                elif self.mode == 'rate':
+                    await self.run_rate(session)
+                elif self.profile:
+                    await self.run_profile_pool(session)
+                else:
+                    await self.run_pool(session)
+        finally:
+            ticker.cancel()
+            if self.results_out:
+                self.results_out.close()
+                self.results_out = None
+        # 最后一个不完整的周期
+        if self.current_interval.completed:
+            self.emit_interval(started)
+
         self.end_time = datetime.now()
+
+    async def run_test(self):
+        self.print_header()
+        if self.output:
+            self.timeseries = TimeSeriesWriter(self.output)
+        try:
+            await self.execute()
+        finally:
+            if self.timeseries:
+                self.timeseries.close()
+        print("\n\n测试完成！")
+        self.print_results()
+
+    def run_workers(self, workers):
+        """
+        多进程模式: 每个子进程运行独立的 LoadTester 事件循环，
+        父进程汇总显示进度，结束后合并直方图和错误统计再输出报告
+        """
+        if self.mode != 'rate' and not self.profile:
+            workers = max(1, min(workers, self.total_requests))
+        self.print_header(workers)
+
+        progress = multiprocessing.Array('q', 2 * workers, lock=False)
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=run_worker, args=(config, i, progress, results), daemon=True)
+            for i, config in enumerate(self.worker_configs(workers))
+        ]
+
+        if self.output:
+            self.timeseries = TimeSeriesWriter(self.output)
+        self.start_time = datetime.now()
+        started = last_tick = time.perf_counter()
+        for process in processes:
+            process.start()
+
+        # 子进程按各自的周期上报指标，父进程按自己的时钟合并后输出，
+        # 先取完结果再 join，避免子进程阻塞在写队列上
+        pending = set(range(workers))
+        failures = []
+        window = RequestStats()
+        in_flight = [0] * workers
+        try:
+            while pending:
+                try:
+                    timeout = max(0.0, min(0.5, last_tick + self.interval - time.perf_counter()))
+                    kind, index, payload = results.get(timeout=timeout)
+                    if kind == 'interval':
+                        stats, in_flight[index] = payload
+                        window.merge(stats)
+                    else:
+                        pending.discard(index)
+                        in_flight[index] = 0
+                        if kind == 'done':
+                            self.merge(payload)
+                        else:
+                            failures.append(f"进程 {index}: {payload}")
+                except Empty:
+                    for index in list(pending):
+                        if processes[index].exitcode not in (None, 0):
+                            pending.discard(index)
+                            failures.append(f"进程 {index}: 异常退出 (exitcode={processes[index].exitcode})")
+                now = time.perf_counter()
+                if now - last_tick >= self.interval or (not pending and window.completed):
+                    self.write_interval(self.interval_row(window, now - started, now - last_tick, sum(in_flight)))
+                    window = RequestStats()
+                    last_tick = now
+                self.print_aggregated_progress(progress, pending)
+        finally:
+            if self.timeseries:
+                self.timeseries.close()
+
+        for process in processes:
+            process.join()
+        self.end_time = datetime.now()
+        if self.results_file:
+            self.merge_results_files(workers)
+
         print("\n\n测试完成！")
+        for failure in failures:
+            print(failure)
         self.print_results()
 
+    def merge_results_files(self, workers):
+        """把各进程写的逐请求记录分片按进程顺序拼接成一个文件"""
+        with open(self.results_file, 'wb') as out:
+            for i in range(workers):
+                part = f"{self.results_file}.{i}"
+                try:
+                    with open(part, 'rb') as f:
+                        shutil.copyfileobj(f, out)
+                    os.remove(part)
+                except FileNotFoundError:
+                    pass
+
+    def print_aggregated_progress(self, progress, pending):
+        # 已回传结果的进程计数已合并进 self，只需再加上仍在运行的进程
+        sent, completed = self.sent, self.completed
+        for index in pending:
+            sent += progress[2 * index]
+            completed += progress[2 * index + 1]
+        self.print_progress(sent, completed)
+
     def print_results(self):
         # 计算统计数据
-        response_times = [r['response_time'] for r in self.results if r['status'] == 200]
-        if not response_times:
+        if not self.histogram.count:
             print("没有成功的请求！")
             return
 
-        successful_requests = len(response_times)
-        failed_requests = len(self.results) - successful_requests
+        successful_requests = self.histogram.count
+        failed_requests = self.completed - successful_requests
         total_time = (self.end_time - self.start_time).total_seconds()
         
         print("\n=== 测试结果摘要 ===")
         print(f"测试持续时间: {total_time:.2f} 秒")
         print(f"成功请求数: {successful_requests}")
         print(f"失败请求数: {failed_requests}")
-        print(f"实际RPS (Requests Per Second): {len(self.results) / total_time:.2f}")
-        
-        if response_times:
-            print(f"\n响应时间统计 (秒):")
-            print(f"最小: {min(response_times):.3f}")
-            print(f"最大: {max(response_times):.3f}")
-            print(f"平均: {statistics.mean(response_times):.3f}")
-            print(f"中位数: {statistics.median(response_times):.3f}")
-            
-            # 计算百分位数
-            percentiles = [50, 75, 90, 95, 99]
-            sorted_times = sorted(response_times)
-            for p in percentiles:
-                index = int(len(sorted_times) * (p / 100))
-                print(f"P{p}: {sorted_times[index]:.3f}")
+        if self.mode == 'rate' and not self.profile:
+            print(f"目标RPS: {self.rate:.2f}")
+        print(f"实际RPS (Requests Per Second): {self.completed / total_time:.2f}")
+
+        # 百分位数从直方图读取，相对误差 < 1%
+        print(f"\n响应时间统计 (秒):")
+        print(f"最小: {self.histogram.min:.3f}")
+        print(f"最大: {self.histogram.max:.3f}")
+        print(f"平均: {self.histogram.mean:.3f}")
+        print(f"中位数: {self.histogram.percentile(50):.3f}")
+        for p in [50, 75, 90, 95, 99]:
+            print(f"P{p}: {self.histogram.percentile(p):.3f}")
+
+        if len(self.endpoint_stats) > 1:
+            print("\n按接口统计 (秒):")
+            for name, stats in self.endpoint_stats.items():
+                h = stats.histogram
+                print(f"{name}: 请求 {stats.completed} | 失败 {stats.errors} | "
+                      f"平均 {h.mean:.3f} | P50 {h.percentile(50):.3f} | "
+                      f"P95 {h.percentile(95):.3f} | P99 {h.percentile(99):.3f}")
+
+        if self.profile and self.stage_stats:
+            self.print_stages()
+
+        new_conns = self.conn_stats['new']
+        reused_conns = self.conn_stats['reused']
+        if new_conns + reused_conns:
+            print(f"\n连接复用统计:")
+            print(f"新建连接: {new_conns}")
+            print(f"复用连接: {reused_conns}")
+            print(f"复用率: {reused_conns / (new_conns + reused_conns) * 100:.1f}%")
 
         if self.errors:
             print("\n错误统计:")
             for error, count in self.errors.items():
                 print(f"{error}: {count} 次")
 
+    def print_stages(self):
+        unit = 'RPS' if self.mode == 'rate' else '并发'
+        stages = []
+        for (start_load, end_load, duration), stats in zip(self.profile.stages(), self.stage_stats):
+            stages.append({
+                'load': (start_load + end_load) / 2,
+                'throughput': (stats.completed - stats.errors) / duration,
+                'p99': stats.histogram.percentile(99),
+                'error_rate': stats.errors / stats.completed if stats.completed else 0.0
+            })
+
+        print(f"\n按阶段统计:")
+        for i, stage in enumerate(stages, 1):
+            print(f"阶段 {i}: 负载 {stage['load']:.1f} {unit} | 吞吐 {stage['throughput']:.1f} RPS | "
+                  f"P99 {stage['p99']:.3f} 秒 | 错误率 {stage['error_rate'] * 100:.2f}%")
+
+        knee = find_knee(stages)
+        if knee is None:
+            print("未发现拐点: 吞吐随负载持续增长，可继续提高负载上限")
+        else:
+            before, after = stages[knee - 1], stages[knee]
+            print(f"拐点: 负载约 {before['load']:.1f} {unit} (吞吐 {before['throughput']:.1f} RPS)，"
+                  f"继续增加到 {after['load']:.1f} {unit} 时吞吐仅 {after['throughput']:.1f} RPS，"
+                  f"P99 从 {before['p99']:.3f} 秒升到 {after['p99']:.3f} 秒")
+
+def run_worker(config, index, progress, results):
+    """子进程入口: 运行一个独立的 LoadTester 并把统计快照放回结果队列"""
+    tester = LoadTester(**config)
+    tester.progress = (progress, index)
+    tester.interval_queue = results
+    try:
+        asyncio.run(tester.execute())
+        results.put(('done', index, tester.snapshot()))
+    except Exception as e:
+        results.put(('error', index, str(e)))
+
 def main():
     parser = argparse.ArgumentParser(description='Website Load Testing Tool')
-    parser.add_argument('url', help='要测试的网站URL')
+    parser.add_argument('url', nargs='?', help='要测试的网站URL (使用 --scenario 时可省略)')
+    parser.add_argument('--scenario', help='场景文件(JSONL)，每行一个请求模板: method/url/headers/body/weight')
+    parser.add_argument('-m', '--method', default='GET', help='请求方法 (默认: GET)')
+    parser.add_argument('-H', '--header', action='append', default=[], help='自定义请求头，格式 "Name: Value"，可多次指定')
+    parser.add_argument('-d', '--data', help='请求体')
     parser.add_argument('-n', '--requests', type=int, default=100, help='总请求数 (默认: 100)')
     parser.add_argument('-c', '--concurrent', type=int, default=10, help='并发请求数 (默认: 10)')
     parser.add_argument('-t', '--timeout', type=int, default=30, help='请求超时时间(秒) (默认: 30)')
+    parser.add_argument('--mode', choices=MODES, default='pool',
+                        help='调度模式: pool 持续保持 N 个请求在途, batch 按批次等待最慢请求, '
+                             'rate 开环恒定到达率 (默认: pool, 指定 --rate 时为 rate)')
+    parser.add_argument('--rate', type=float, help='开环模式的目标 RPS，忽略 -n 和 -c')
+    parser.add_argument('--duration', type=float, default=60, help='开环模式持续时间(秒) (默认: 60)')
+    parser.add_argument('--arrival', choices=ARRIVALS, default='constant',
+                        help='开环模式的到达分布: constant 恒定间隔, poisson 泊松到达 (默认: constant)')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='压测进程数，请求数/并发数/目标速率在进程间平均分配 (默认: 1)')
+    parser.add_argument('--profile', choices=PROFILES,
+                        help='负载曲线: ramp 线性爬坡, step 阶梯, spike 尖峰；负载在 pool 模式为并发数、rate 模式为 RPS，'
+                             '指定后忽略 -n/-c/--rate/--duration')
+    parser.add_argument('--start', type=float, default=10, help='负载曲线的起始(基线)负载 (默认: 10)')
+    parser.add_argument('--end', type=float, default=100, help='负载曲线的最终(峰值)负载 (默认: 100)')
+    parser.add_argument('--steps', type=int, default=5, help='负载曲线的阶段数 (默认: 5)')
+    parser.add_argument('--step-duration', type=float, default=10, help='每个阶段的持续时间(秒) (默认: 10)')
+    parser.add_argument('-i', '--interval', type=float, default=1.0, help='实时指标的统计周期(秒) (默认: 1)')
+    parser.add_argument('-o', '--output', help='把每个统计周期的指标写入文件，.csv 为 CSV 格式，其他为 JSONL')
+    parser.add_argument('--results-file',
+                        help='把每个请求的记录(编号/接口/状态码/延迟/错误)逐行写入 JSONL 文件 (默认只记录延迟直方图)')
+    parser.add_argument('--pool-size', type=int, default=0, help='连接池总连接数上限, 0 为不限制 (默认: 0)')
+    parser.add_argument('--limit-per-host', type=int, default=0, help='单个主机的连接数上限, 0 为不限制 (默认: 0)')
+    parser.add_argument('--keepalive-timeout', type=float, default=15, help='空闲连接保活时间(秒) (默认: 15)')
+    parser.add_argument('--dns-ttl', type=int, default=10, help='DNS 缓存有效期(秒) (默认: 10)')
     
     args = parser.parse_args()
+    if not args.url and not args.scenario:
+        parser.error('需要指定 URL 或 --scenario')
+    if args.requests < 1 or args.concurrent < 1:
+        parser.error('-n 和 -c 必须大于 0')
+    if args.interval <= 0:
+        parser.error('--interval 必须大于 0')
+    if args.rate:
+        args.mode = 'rate'
+    elif args.mode == 'rate' and not args.profile:
+        parser.error('rate 模式需要指定 --rate')
+    if args.profile and args.mode == 'batch':
+        parser.error('负载曲线不支持 batch 模式')
     
     # 安全提示
     print("\n=== 安全提示 ===")
@@ -146,8 +1010,41 @@ def main():
         print("测试已取消")
         return
 
-    tester = LoadTester(args.url, args.requests, args.concurrent, args.timeout)
-    asyncio.run(tester.run_test())
+    if args.scenario:
+        scenario = Scenario.load(args.scenario)
+    else:
+        headers = {}
+        for header in args.header:
+            name, sep, value = header.partition(':')
+            if not sep:
+                parser.error(f'请求头格式错误: {header}')
+            headers[name.strip()] = value.strip()
+        scenario = Scenario.single(args.url, args.method, headers, args.data)
+
+    profile = None
+    if args.profile:
+        try:
+            profile = LoadProfile(args.profile, args.start, args.end, args.steps, args.step_duration)
+        except ValueError as e:
+            parser.error(str(e))
+
+    tester = LoadTester(args.url, args.requests, args.concurrent, args.timeout, args.mode,
+                        pool_size=args.pool_size,
+                        limit_per_host=args.limit_per_host,
+                        keepalive_timeout=args.keepalive_timeout,
+                        dns_ttl=args.dns_ttl,
+                        rate=args.rate,
+                        duration=args.duration,
+                        arrival=args.arrival,
+                        results_file=args.results_file,
+                        interval=args.interval,
+                        output=args.output,
+                        scenario=scenario,
+                        profile=profile)
+    if args.workers > 1:
+        tester.run_workers(args.workers)
+    else:
+        asyncio.run(tester.run_test())
 
 if __name__ == '__main__':
     main()
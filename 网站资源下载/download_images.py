@@ -2,9 +2,23 @@ import requests
 import os
 import time
 import re
+import json
+import sqlite3
+import hashlib
+import argparse
+import threading
+from collections import deque
+from html.parser import HTMLParser
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse, urljoin, urldefrag, unquote
 from requests.adapters import HTTPAdapter
 from requests.packages.urllib3.util.retry import Retry
 
+SAVE_DIR = 'downloaded_images'
+CHUNK_SIZE = 64 * 1024
+MANIFEST_FILE = os.path.join(SAVE_DIR, '.manifest.db')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.bmp', '.svg', '.avif')
+
 def create_session():
     """
     创建一个带有重试机制的会话
@@ -29,58 +43,477 @@ def create_session():
     
     return session
 
-def extract_pattern(url):
+class HostRateLimiter:
     """
-    从示例URL中提取模式
+    按主机限速: 同一主机相邻两次请求的发出时间至少间隔 1/rate 秒，
+    各线程先预约发送时间再在锁外等待，不同主机之间互不影响
     """
-    # 查找包含数字的部分
-    pattern = re.search(r'(_\d{3}_)', url)
-    if not pattern:
-        raise ValueError("无法从URL中识别出编号模式！请确保URL中包含类似'_001_'的数字编号。")
-    
-    # 替换数字部分为占位符
-    pattern_str = url.replace(pattern.group(), '_{:03d}_')
-    return pattern_str
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0
+        self.lock = threading.Lock()
+        self.next_time = {}
+
+    def wait(self, url):
+        if not self.interval:
+            return
+        host = urlparse(url).netloc
+        with self.lock:
+            now = time.monotonic()
+            send_time = max(now, self.next_time.get(host, now))
+            self.next_time[host] = send_time + self.interval
+        if send_time > now:
+            time.sleep(send_time - now)
+
+class Manifest:
+    """
+    下载清单: 记录每个 URL 对应的文件名、大小、ETag/Last-Modified 和 SHA-256，
+    重复运行时据此发送条件请求跳过未变化的文件，并续传未完成的文件。
+    保存在 SQLite 中，每次更新只写一行，百万级 URL 时也不需要整体重写清单
+    """
+    FIELDS = ('filename', 'size', 'etag', 'last_modified', 'sha256', 'mtime', 'complete')
+
+    def __init__(self, path=MANIFEST_FILE, commit_every=200):
+        self.path = path
+        self.commit_every = commit_every
+        self.lock = threading.Lock()
+        self.dirty = 0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        created = not os.path.exists(path)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute('CREATE TABLE IF NOT EXISTS entries (url TEXT PRIMARY KEY, filename TEXT, size INTEGER, '
+                        'etag TEXT, last_modified TEXT, sha256 TEXT, mtime REAL, complete INTEGER)')
+        if created:
+            self._import_json(os.path.splitext(path)[0] + '.json')
+        self.db.commit()
+
+    def _import_json(self, json_path):
+        """导入旧版本的 JSON 清单，升级后不必重新下载"""
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        for url, entry in entries.items():
+            self._upsert(url, entry)
+        print(f"已从 {json_path} 导入 {len(entries)} 条下载记录")
+
+    def get(self, url):
+        with self.lock:
+            row = self.db.execute(f"SELECT {', '.join(self.FIELDS)} FROM entries WHERE url = ?", (url,)).fetchone()
+        if not row:
+            return None
+        entry = {name: value for name, value in zip(self.FIELDS, row) if value is not None}
+        entry['complete'] = bool(entry.get('complete'))
+        return entry
+
+    def update(self, url, **fields):
+        with self.lock:
+            self._upsert(url, fields)
+            self.dirty += 1
+            if self.dirty >= self.commit_every:
+                self.db.commit()
+                self.dirty = 0
+
+    def _upsert(self, url, fields):
+        names = [name for name in self.FIELDS if name in fields]
+        if not names:
+            self.db.execute("INSERT OR IGNORE INTO entries (url) VALUES (?)", (url,))
+            return
+        values = [int(fields[name]) if name == 'complete' else fields[name] for name in names]
+        assignments = ', '.join(f"{name} = excluded.{name}" for name in names)
+        self.db.execute(f"INSERT INTO entries (url, {', '.join(names)}) VALUES (?{', ?' * len(names)}) "
+                        f"ON CONFLICT(url) DO UPDATE SET {assignments}", [url] + values)
+
+    def save(self):
+        with self.lock:
+            self.db.commit()
+            self.dirty = 0
+
+def file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+class UrlTemplate:
+    """
+    URL 模板，花括号中的部分会被展开，可以出现多处:
+    - {1-120}      数字范围
+    - {001-120}    起始编号带前导零时按其位数补零
+    - {1-120:4}    显式指定补零位数
+    - {a-z}        字符范围
+    - {png,jpg}    候选列表
+    - {{ 和 }}     表示字面上的花括号
+
+    展开是惰性的生成器，不会为上百万个组合预先建立列表
+    """
+    TOKEN_RE = re.compile(r'\{\{|\}\}|\{([^{}]*)\}')
+    NUMBER_RE = re.compile(r'^(\d+)-(\d+)(?::(\d+))?$')
+    CHAR_RE = re.compile(r'^([A-Za-z])-([A-Za-z])$')
+
+    def __init__(self, template):
+        self.template = template
+        # 字面字符串与 (取值生成函数, 取值个数) 交替出现
+        self.parts = []
+        literal = ''
+        pos = 0
+        for match in self.TOKEN_RE.finditer(template):
+            literal += template[pos:match.start()]
+            pos = match.end()
+            if match.group() in ('{{', '}}'):
+                literal += match.group()[0]
+                continue
+            if literal:
+                self.parts.append(literal)
+                literal = ''
+            self.parts.append(self._parse_token(match.group(1)))
+        literal += template[pos:]
+        if literal:
+            self.parts.append(literal)
+
+    def _parse_token(self, token):
+        number = self.NUMBER_RE.match(token)
+        if number:
+            start, end, width = number.groups()
+            width = int(width) if width else (len(start) if start.startswith('0') and len(start) > 1 else 0)
+            start, end = int(start), int(end)
+            if start > end:
+                raise ValueError(f"范围起点不能大于终点: {{{token}}}")
+            return (lambda: (f"{i:0{width}d}" for i in range(start, end + 1))), end - start + 1
+        char = self.CHAR_RE.match(token)
+        if char:
+            start, end = ord(char.group(1)), ord(char.group(2))
+            if start > end:
+                raise ValueError(f"范围起点不能大于终点: {{{token}}}")
+            return (lambda: (chr(c) for c in range(start, end + 1))), end - start + 1
+        if ',' in token:
+            choices = token.split(',')
+            return (lambda: iter(choices)), len(choices)
+        raise ValueError(f"无法识别的模板片段: {{{token}}}")
+
+    def __len__(self):
+        count = 1
+        for part in self.parts:
+            if not isinstance(part, str):
+                count *= part[1]
+        return count
+
+    def __iter__(self):
+        return self._expand(0, '')
+
+    def _expand(self, index, prefix):
+        if index == len(self.parts):
+            yield prefix
+            return
+        part = self.parts[index]
+        if isinstance(part, str):
+            yield from self._expand(index + 1, prefix + part)
+            return
+        for value in part[0]():
+            yield from self._expand(index + 1, prefix + value)
+
+def extract_pattern(url, start, end):
+    """
+    从示例URL中提取模式: 文件名中最后一段数字视为编号，替换为 {起始-结束} 模板，
+    按示例中编号的位数补零
+    """
+    name_start = url.rfind('/') + 1
+    matches = list(re.finditer(r'\d+', url[name_start:]))
+    if not matches:
+        raise ValueError("无法从URL中识别出编号模式！请确保文件名中包含类似'001'的数字编号。")
+
+    number = matches[-1]
+    prefix = url[:name_start + number.start()]
+    suffix = url[name_start + number.end():]
+    width = len(number.group())
+
+    def escape(text):
+        return text.replace('{', '{{').replace('}', '}}')
+
+    return f"{escape(prefix)}{{{start}-{end}:{width}}}{escape(suffix)}"
+
+class LinkExtractor(HTMLParser):
+    """
+    从 HTML 中提取图片地址(img src/srcset、指向图片的链接)和普通页面链接
+    """
+    def __init__(self, base_url):
+        super().__init__()
+        self.base_url = base_url
+        self.images = []
+        self.pages = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'base' and attrs.get('href'):
+            self.base_url = urljoin(self.base_url, attrs['href'])
+        elif tag in ('img', 'source'):
+            for name in ('src', 'data-src'):
+                if attrs.get(name):
+                    self.images.append(self._absolute(attrs[name]))
+            for candidate in (attrs.get('srcset') or '').split(','):
+                candidate = candidate.strip().split(' ')[0]
+                if candidate:
+                    self.images.append(self._absolute(candidate))
+        elif tag == 'a' and attrs.get('href'):
+            url = self._absolute(attrs['href'])
+            if urlparse(url).path.lower().endswith(IMAGE_EXTENSIONS):
+                self.images.append(url)
+            else:
+                self.pages.append(url)
+
+    def _absolute(self, url):
+        return urldefrag(urljoin(self.base_url, url))[0]
+
+def crawl_images(start_url, depth=0, limiter=None, session=None):
+    """
+    爬取模式: 从起始页面提取图片地址，按广度优先访问同一主机下 depth 层以内的页面。
+    页面和图片地址都经过去重，图片地址一经发现立即产出，下载与爬取同时进行
+    """
+    session = session or create_session()
+    host = urlparse(start_url).netloc
+    frontier = deque([(start_url, 0)])
+    seen_pages = {start_url}
+    seen_images = set()
+
+    while frontier:
+        page_url, level = frontier.popleft()
+        try:
+            if limiter:
+                limiter.wait(page_url)
+            print(f"正在解析页面: {page_url}")
+            response = session.get(page_url, timeout=15, headers={'Accept': 'text/html,*/*;q=0.8'})
+            if response.status_code != 200 or 'html' not in response.headers.get('Content-Type', ''):
+                print(f"✗ 跳过页面: {page_url} (状态码 {response.status_code})")
+                continue
+            extractor = LinkExtractor(response.url)
+            extractor.feed(response.text)
+        except requests.exceptions.RequestException as e:
+            print(f"✗ 页面获取失败: {e}")
+            continue
+
+        for image_url in extractor.images:
+            if image_url.startswith(('http://', 'https://')) and image_url not in seen_images:
+                seen_images.add(image_url)
+                yield image_url
+        if level < depth:
+            for link in extractor.pages:
+                if urlparse(link).netloc == host and link not in seen_pages:
+                    seen_pages.add(link)
+                    frontier.append((link, level + 1))
+
+def local_filename(url):
+    """
+    由 URL 的主机和路径得到保存位置(相对于 SAVE_DIR)，保证不同 URL 不会写到同一个文件，
+    例如 {a-c}/img_001.jpg 展开出的同名图片分别保存在各自的目录中。
+    带查询参数时在文件名后追加查询串的短哈希
+    """
+    parsed = urlparse(url)
+    parts = [part for part in unquote(parsed.path).split('/') if part not in ('', '.', '..')]
+    if not parts or parsed.path.endswith('/'):
+        parts.append('index')
+    if parsed.query:
+        stem, ext = os.path.splitext(parts[-1])
+        parts[-1] = f"{stem}_{hashlib.sha1(parsed.query.encode()).hexdigest()[:8]}{ext}"
+    return os.path.join(parsed.netloc.replace(':', '_'), *parts)
+
+def file_sha256(path):
+    checksum = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            checksum.update(chunk)
+    return checksum.hexdigest()
+
+def local_file_matches(entry, filename, save_path):
+    """
+    本地文件是否仍是清单中记录的那次下载: 文件名和大小一致，修改时间未变；
+    修改时间变了(被覆盖或复制过)时再计算 SHA-256 比对
+    """
+    if entry.get('filename') != filename or file_size(save_path) != entry.get('size'):
+        return False
+    try:
+        if os.path.getmtime(save_path) == entry.get('mtime'):
+            return True
+        return file_sha256(save_path) == entry.get('sha256')
+    except OSError:
+        return False
 
-def download_image(session, url_pattern, number):
+def conditional_headers(entry, filename, save_path, temp_path):
     """
-    下载指定编号的图片
+    根据清单记录构造请求头:
+    - 本地文件与清单记录一致: 发送 If-None-Match/If-Modified-Since，未变化时服务器返回 304
+    - 存在未完成的 .part 文件: 发送 Range 续传，If-Range 保证文件变化时从头下载
+
+    Returns:
+        (请求头, 续传起始字节)
+    """
+    headers = {}
+    if not entry:
+        return headers, 0
+    etag = entry.get('etag')
+    last_modified = entry.get('last_modified')
+    if entry.get('complete') and local_file_matches(entry, filename, save_path):
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return headers, 0
+    partial_size = file_size(temp_path)
+    if not entry.get('complete') and entry.get('filename') == filename and partial_size and (etag or last_modified):
+        headers['Range'] = f'bytes={partial_size}-'
+        headers['If-Range'] = etag or last_modified
+        return headers, partial_size
+    return headers, 0
+
+def download_image(session, url, limiter=None, manifest=None):
+    """
+    下载一张图片，响应体按块流式写入磁盘，不在内存中保存整个文件。
+    提供下载清单时使用条件请求和断点续传
     
     Args:
         session: 请求会话
-        url_pattern: URL模式字符串
-        number (int): 图片编号
-    """
-    # 使用提供的模式生成URL
-    url = url_pattern.format(number)
+        url: 图片URL
+        limiter: 按主机限速器
+        manifest: 下载清单
     
+    Returns:
+        本次写入的字节数，文件未变化时为 0，下载失败返回 None
+    """
+    # 保存路径由主机和路径决定，清单中记录的 filename 即该相对路径
+    filename = local_filename(url)
+    save_path = os.path.join(SAVE_DIR, filename)
+    # 每个 URL 有自己的临时文件，完整下载后再改名，中断时不会留下残缺的图片
+    temp_path = save_path + '.part'
+    entry = manifest.get(url) if manifest else None
+    headers, resume_from = conditional_headers(entry, filename, save_path, temp_path)
+
     try:
+        if limiter:
+            limiter.wait(url)
         print(f"正在下载: {url}")
-        response = session.get(url, timeout=15)
-        
-        if response.status_code == 200:
-            if 'image' in response.headers.get('Content-Type', ''):
-                if not os.path.exists('downloaded_images'):
-                    os.makedirs('downloaded_images')
-                
-                # 从URL中提取文件名
-                filename = url.split('/')[-1]
-                save_path = os.path.join('downloaded_images', filename)
-                
-                with open(save_path, 'wb') as f:
-                    f.write(response.content)
-                
-                print(f"✓ 成功下载图片: {filename}")
-                return True
-            else:
+        with session.get(url, timeout=15, stream=True, headers=headers) as response:
+            if response.status_code == 304:
+                print(f"= 未变化，跳过: {filename}")
+                return 0
+            if response.status_code == 416:
+                # 本地残留的 .part 与服务器文件不一致，删除后由重试从头下载
+                print(f"✗ 续传位置无效，将从头下载: {filename}")
+                os.remove(temp_path)
+                return None
+            if response.status_code not in (200, 206):
+                print(f"✗ 错误: 状态码 {response.status_code}")
+                return None
+            if 'image' not in response.headers.get('Content-Type', ''):
                 print(f"✗ 错误: URL返回的不是图片内容")
-        else:
-            print(f"✗ 错误: 状态码 {response.status_code}")
-            
-    except requests.exceptions.RequestException as e:
+                return None
+
+            os.makedirs(os.path.dirname(save_path), exist_ok=True)
+            # 服务器忽略 Range 或 If-Range 校验失败时返回 200，需要从头写
+            resumed = response.status_code == 206
+            if not resumed:
+                resume_from = 0
+            checksum = hashlib.sha256()
+            if resumed:
+                with open(temp_path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                        checksum.update(chunk)
+            if manifest:
+                manifest.update(url, filename=filename, complete=False,
+                                etag=response.headers.get('ETag'),
+                                last_modified=response.headers.get('Last-Modified'))
+
+            size = 0
+            with open(temp_path, 'ab' if resumed else 'wb') as f:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    f.write(chunk)
+                    checksum.update(chunk)
+                    size += len(chunk)
+            os.replace(temp_path, save_path)
+            if manifest:
+                manifest.update(url, size=resume_from + size, sha256=checksum.hexdigest(),
+                                mtime=os.path.getmtime(save_path), complete=True)
+
+            if resumed:
+                print(f"✓ 成功下载图片: {filename} (从 {format_size(resume_from)} 处续传)")
+            else:
+                print(f"✓ 成功下载图片: {filename}")
+            return size
+
+    except (requests.exceptions.RequestException, OSError) as e:
         print(f"✗ 下载失败: {e}")
+
+    return None
+
+def download_with_retry(get_session, url, limiter, manifest=None, retries=3, backoff=0.5):
+    """
+    下载失败时按指数退避重试
+    """
+    for attempt in range(retries):
+        size = download_image(get_session(), url, limiter, manifest)
+        if size is not None:
+            return size
+        if attempt < retries - 1:
+            delay = backoff * (2 ** attempt)
+            print(f"将在{delay:.1f}秒后重试: {url} (剩余重试次数: {retries - attempt - 1})")
+            time.sleep(delay)
+    return None
+
+def download_all(urls, workers=4, limiter=None, retries=3, manifest=None):
+    """
+    并发下载引擎: 线程池中的每个线程使用各自的会话，
+    按主机限速代替固定的间隔等待。urls 可以是任意可迭代对象(模板展开、爬取结果)，
+    边产生边下载，只保留有限个任务在排队
     
-    return False
+    Returns:
+        (成功数, 其中未变化跳过数, 总数, 总字节数, 耗时秒数)
+    """
+    local = threading.local()
+
+    def get_session():
+        if not hasattr(local, 'session'):
+            local.session = create_session()
+        return local.session
+
+    success_count = 0
+    unchanged_count = 0
+    total_count = 0
+    total_bytes = 0
+    start_time = time.monotonic()
+
+    def collect(futures):
+        nonlocal success_count, unchanged_count, total_bytes
+        for future in futures:
+            size = future.result()
+            if size is not None:
+                success_count += 1
+                total_bytes += size
+                if size == 0:
+                    unchanged_count += 1
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = set()
+            for url in urls:
+                total_count += 1
+                pending.add(executor.submit(download_with_retry, get_session, url, limiter, manifest, retries))
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+            collect(pending)
+    finally:
+        # 中断时也保存清单，下次运行可以续传
+        if manifest:
+            manifest.save()
+
+    return success_count, unchanged_count, total_count, total_bytes, time.monotonic() - start_time
+
+def format_size(size):
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size < 1024:
+            return f"{size:.2f}{unit}"
+        size /= 1024
+    return f"{size:.2f}TB"
 
 def get_number_range():
     """
@@ -96,9 +529,6 @@ def get_number_range():
             if start < 1:
                 print("起始编号不能小于1！")
                 continue
-            if end > 999:
-                print("结束编号不能大于999！")
-                continue
             return start, end
         except ValueError:
             print("格式错误！请使用正确的格式，例如：1-6")
@@ -107,47 +537,61 @@ def main():
     """
     主函数：处理用户输入并下载图片
     """
+    parser = argparse.ArgumentParser(description='按编号批量下载图片')
+    parser.add_argument('-u', '--template',
+                        help='URL 模板，例如 https://example.com/{a-c}/img_{001-500}.{jpg,png}，省略时交互输入')
+    parser.add_argument('--crawl', metavar='PAGE_URL', help='爬取模式: 下载页面中引用的所有图片')
+    parser.add_argument('--depth', type=int, default=0, help='爬取模式下跟随同站链接的层数 (默认: 0，仅起始页面)')
+    parser.add_argument('-w', '--workers', type=int, default=4, help='并发下载线程数 (默认: 4)')
+    parser.add_argument('-r', '--rate-per-host', type=float, default=2.0,
+                        help='每个主机每秒最多发出的请求数, 0 为不限速 (默认: 2)')
+    parser.add_argument('--retries', type=int, default=3, help='每张图片的最大尝试次数 (默认: 3)')
+    parser.add_argument('--force', action='store_true', help='忽略下载清单，重新下载所有文件')
+    args = parser.parse_args()
+
     try:
-        # 获取示例URL
-        example_url = input("请输入示例URL（包含编号，例如: https://example.com/image_001.png）: ")
-        
-        # 获取下载范围
-        start_num, end_num = get_number_range()
-        
-        # 提取URL模式
-        url_pattern = extract_pattern(example_url)
-        print(f"\n识别到的URL模式: {url_pattern}")
-        print(f"将下载范围: {start_num} 到 {end_num}\n")
-        
-        # 确认
-        confirm = input("是否确认开始下载？(y/n): ")
-        if confirm.lower() != 'y':
-            print("已取消下载")
-            return
-        
+        limiter = HostRateLimiter(args.rate_per_host)
+        if args.crawl:
+            print(f"\n爬取页面: {args.crawl}，跟随链接层数: {args.depth}")
+            urls = crawl_images(args.crawl, args.depth, limiter)
+        else:
+            template = args.template
+            if not template:
+                # 获取示例URL
+                example_url = input("请输入示例URL（包含编号，例如: https://example.com/image_001.png，"
+                                    "或直接输入带 {1-100} 的模板）: ")
+                if '{' in example_url:
+                    template = example_url
+                else:
+                    # 获取下载范围
+                    start_num, end_num = get_number_range()
+                    # 提取URL模式
+                    template = extract_pattern(example_url, start_num, end_num)
+
+            urls = UrlTemplate(template)
+            print(f"\n识别到的URL模式: {template}")
+            print(f"共 {len(urls)} 个URL\n")
+
+            # 确认
+            confirm = input("是否确认开始下载？(y/n): ")
+            if confirm.lower() != 'y':
+                print("已取消下载")
+                return
+
         print("\n=== 开始下载图片 ===")
-        session = create_session()
-        success_count = 0
-        total_count = end_num - start_num + 1
-        
-        for i in range(start_num, end_num + 1):
-            retry_count = 3
-            while retry_count > 0:
-                if download_image(session, url_pattern, i):
-                    success_count += 1
-                    break
-                retry_count -= 1
-                if retry_count > 0:
-                    print(f"将在2秒后重试... (剩余重试次数: {retry_count})")
-                    time.sleep(2)
-            
-            # 每张图片下载之间暂停1秒
-            if i < end_num:
-                time.sleep(1)
-        
+        manifest = None if args.force else Manifest()
+        success_count, unchanged_count, total_count, total_bytes, elapsed = download_all(
+            urls, workers=args.workers, limiter=limiter,
+            retries=args.retries, manifest=manifest)
+
         print("\n=== 下载任务完成 ===")
         print(f"成功下载: {success_count}/{total_count} 张图片")
-        print(f"图片保存在 'downloaded_images' 文件夹中")
+        if unchanged_count:
+            print(f"其中未变化跳过: {unchanged_count} 张")
+        print(f"总大小: {format_size(total_bytes)}，耗时: {elapsed:.2f} 秒")
+        if elapsed > 0:
+            print(f"平均速度: {format_size(total_bytes / elapsed)}/s，{success_count / elapsed:.2f} 张/秒")
+        print(f"图片按 主机/路径 保存在 '{SAVE_DIR}' 文件夹中")
         
     except KeyboardInterrupt:
         print("\n\n下载已被用户中断")